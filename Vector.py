@@ -1,10 +1,29 @@
-from copy import deepcopy
+import os
+import weakref
+from array import array
+from collections import OrderedDict, namedtuple
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AbstractContextManager, contextmanager
+from functools import partial, reduce
+from itertools import repeat
+from math import acos, cos, prod, sin, sqrt
+from multiprocessing.shared_memory import SharedMemory
+from operator import add, mul, neg, sub, truediv
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy
 
 
 class Vector:
     """Vector class for 1D and 2D vectors.
     components - List of integers or floats representing the vector.
                     Can also be a list of lists for 2D vectors.
+
+    The components are stored in a single flat array('d') buffer together with
+    the shape, an offset and per-axis strides. Indexing rows or slices returns
+    views that share the buffer with the original vector.
     
     Example usage:
     v1 = Vector([1, 2, 3])
@@ -19,17 +38,18 @@ class Vector:
     >>> v3.dimension
     2
     >>> v2.T
-    Vector([[1, 3], [0, 1]])
+    Vector([[1.0, 3.0], [0, 1.0]])
     """
+    __slots__ = ('_data', '_offset', '_strides', 'shape', 'dimension',
+                 '_base', '_version', '_cache', '__weakref__')
+
     def __init__(self, components: list) -> None:
         if not isinstance(components, list):
             raise TypeError("Vector must be a list.")
+        self._base, self._version, self._cache = None, 0, None
         
         if len(components) == 0:
-            self.shape = (0,)
-            self.dimension = 1
-            self.components = components
-            self._transposed = False
+            self._set_storage(array('d'), (0,))
             return
 
         # Determine if the vector is 1D or 2D
@@ -40,208 +60,384 @@ class Vector:
             for item in components:
                 if not isinstance(item, list) or len(item) != length:
                     raise ValueError("All sub-vectors must be lists of the same length.")
-            self.shape = (len(components), length)
-            self.dimension = 2
+            data = array('d', [a for row in components for a in row])
+            self._set_storage(data, (len(components), length))
         else:
-            if any(isinstance(item, list) for item in components):
-                raise ValueError("Invalid vector format: mix of lists and non-lists.")
-            self.shape = (len(components),)
-            self.dimension = 1
+            try:
+                data = array('d', components)
+            except TypeError:
+                if any(isinstance(item, list) for item in components):
+                    raise ValueError("Invalid vector format: mix of lists and non-lists.")
+                raise
+            self._set_storage(data, (len(components),))
+
+
+    @staticmethod
+    def set_backend(name: str) -> None:
+        """Selects the backend ('python' or 'numpy') used by all vector operations."""
+        set_backend(name)
+
+
+    @staticmethod
+    def get_backend() -> str:
+        """Returns the name of the active backend."""
+        return get_backend()
+
+
+    @staticmethod
+    def lazy() -> AbstractContextManager:
+        """Returns a context manager that makes element-wise arithmetic lazy."""
+        return lazy()
+
+
+    @classmethod
+    def _from_trusted(cls, buffer: array, shape: tuple) -> 'Vector':
+        """Wraps a row-major buffer produced by the library without validating it."""
+        vector = cls.__new__(cls)
+        vector._base, vector._version, vector._cache = None, 0, None
+        vector._set_storage(buffer, shape)
+        return vector
+
+
+    def _set_storage(self, data: array, shape: tuple, offset: int = 0, strides: tuple | None = None) -> None:
+        """Points the vector at a flat buffer. Strides default to row-major order."""
+        self._data = data
+        self._offset = offset
+        self.shape = shape
+        self.dimension = len(shape)
+        self._strides = strides if strides is not None else ((shape[1], 1) if len(shape) == 2 else (1,))
+
+
+    def _view(self, offset: int, shape: tuple, strides: tuple) -> 'Vector':
+        """Returns a vector sharing this vector's buffer."""
+        view = self.__class__.__new__(self.__class__)
+        view._base = self if self._base is None else self._base
+        view._version, view._cache = 0, None
+        view._set_storage(self._data, shape, offset, strides)
+        return view
+
+
+    @property
+    def version(self) -> int:
+        """Mutation counter bumped by item assignment and in-place operations.
+        Views share the counter of the vector that owns their buffer.
+        """
+        return (self if self._base is None else self._base)._version
+
+
+    def _touch(self) -> None:
+        """Bumps the version, dropping results cached from the old contents."""
+        owner = self if self._base is None else self._base
+        owner._version += 1
+        if self._cache:
+            _drop_cached(self)
+        if owner._cache:
+            _drop_cached(owner)
+
+
+    def _values(self) -> list:
+        """Returns the elements as a flat list of floats in row-major order."""
+        data, offset = self._data, self._offset
+        if self.dimension == 1:
+            return _strided(data, offset, self.shape[0], self._strides[0])
         
-        self.components = components
-        self._transposed = False
+        rows, cols = self.shape
+        row_stride, col_stride = self._strides
+        if col_stride == 1 and row_stride == cols:
+            return data[offset:offset + rows * cols].tolist()
+        
+        if row_stride == 1 and col_stride == rows:
+            # Transposed view of a contiguous block: gather each column of the block
+            block = data[offset:offset + rows * cols].tolist()
+            return [a for i in range(rows) for a in block[i::rows]]
+        
+        values = []
+        for i in range(rows):
+            values.extend(_strided(data, offset + i * row_stride, cols, col_stride))
+        return values
 
 
+    def _positions(self) -> list:
+        """Returns the buffer positions of the elements in row-major order."""
+        offset = self._offset
+        if self.dimension == 1:
+            return list(range(offset, offset + self.shape[0] * self._strides[0], self._strides[0]))
+        
+        rows, cols = self.shape
+        row_stride, col_stride = self._strides
+        return [offset + i * row_stride + j * col_stride for i in range(rows) for j in range(cols)]
+    
     
+    def _write(self, values) -> None:
+        """Overwrites the elements in row-major order without reallocating the buffer."""
+        self._touch()
+        data = self._data
+        if self.is_contiguous:
+            data[self._offset:self._offset + _size(self.shape)] = array('d', values)
+            return
+        for position, value in zip(self._positions(), values):
+            data[position] = value
+
+
     @property
     def T(self) -> 'Vector':
+        """Returns a transposed view that shares this vector's buffer."""
         if self.dimension == 1:
             return self
-        transposed_view = Vector(self.components)
-        transposed_view._transposed = not self._transposed
-        return transposed_view
+        return self._view(self._offset, self.shape[::-1], self._strides[::-1])
+
+
+    @property
+    def is_contiguous(self) -> bool:
+        """True if the elements are laid out in row-major order without gaps."""
+        if self.dimension == 1:
+            return self._strides[0] == 1
+        return self._strides == (self.shape[1], 1)
+    
+
+    def contiguous(self) -> 'Vector':
+        """Returns this vector if it is contiguous, otherwise a row-major copy."""
+        return self if self.is_contiguous else self.copy()
     
     
     @property
     def components(self) -> list:
-        if self._transposed:
-            return [list(col) for col in zip(*self._components)]
-        return self._components
+        values = self._values()
+        if self.dimension == 2:
+            cols = self.shape[1]
+            return [values[i:i + cols] for i in range(0, len(values), cols)] if cols else [[] for _ in range(self.shape[0])]
+        return values
     
 
     @components.setter
     def components(self, values):
-        self._components = values
-
-
-    def __add__(self, vector: list | object) -> 'Vector':
-        vector = Vector(vector) if isinstance(vector, list) else vector
-        if isinstance(vector, Vector):
-            if self.shape != vector.shape:
-                raise ValueError("Vectors must have the same shape.")
-            
-            if self.dimension == 2:
-                return Vector([[a + b for a, b in zip(row1, row2)] for row1, row2 in zip(self.components, vector.components)])
-            return Vector([a + b for a, b in zip(self.components, vector.components)])
-        
-        raise TypeError("Unsupported operand type(s) for +: 'Vector' and '{}'".format(type(vector).__name__))
-
-
-    def __sub__(self, vector: list | object) -> 'Vector':
-        vector = Vector(vector) if isinstance(vector, list) else vector
-        if isinstance(vector, Vector):
-            if self.shape != vector.shape:
-                raise ValueError("Vectors must have the same shape.")
-            
-            if self.dimension == 2:
-                return Vector([[a - b for a, b in zip(row1, row2)] for row1, row2 in zip(self.components, vector.components)])
-            return Vector([a - b for a, b in zip(self.components, vector.components)])
-        
-        raise TypeError("Unsupported operand type(s) for -: 'Vector' and '{}'".format(type(vector).__name__))
+        vector = Vector(values)
+        self._touch()
+        self._base = None
+        self._set_storage(vector._data, vector.shape)
+
+
+    def _binary(self, op, other: int | float | list | object, reflected: bool = False) -> 'Vector':
+        """Applies op element-wise with NumPy-style broadcasting of scalars,
+        rows and columns. reflected puts other on the left of the operator.
+        """
+        other = Vector(other) if isinstance(other, list) else other
+        if not isinstance(other, (int, float, Vector)):
+            return NotImplemented
+        if _lazy_depth:
+            return _lazy_binary(op, other, self) if reflected else _lazy_binary(op, self, other)
+        if isinstance(other, (int, float)):
+            return _backend.elementwise(op, other, self) if reflected else _backend.elementwise(op, self, other)
+
+        first, second = self, other
+        if other.shape != self.shape:
+            shape = _broadcast_shape(self.shape, other.shape)
+            first, second = self._broadcast_to(shape), other._broadcast_to(shape)
+        return _backend.elementwise(op, second, first) if reflected else _backend.elementwise(op, first, second)
+
+
+    def _inplace(self, op, other: int | float | list | object) -> 'Vector':
+        """Applies op element-wise, writing the result into this vector's buffer."""
+        other = Vector(other) if isinstance(other, list) else other
+        if isinstance(other, Expression):
+            _lazy_binary(op, self, other).evaluate(out=self)
+            return self
+        self._touch()
+        if isinstance(other, Vector):
+            if _broadcast_shape(self.shape, other.shape) != self.shape:
+                raise ValueError("Vector of shape {} cannot be broadcast to shape {}.".format(other.shape, self.shape))
+            other = other._broadcast_to(self.shape)
+        elif not isinstance(other, (int, float)):
+            return NotImplemented
+        _backend.ielementwise(op, self, other)
+        return self
+
+
+    def _broadcast_to(self, shape: tuple) -> 'Vector':
+        """Returns a read-only-by-convention view that repeats this vector along
+        its length-1 (or missing leading) axes to match shape.
+        """
+        if self.shape == shape:
+            return self
+        padding = len(shape) - self.dimension
+        own_shape = (1,) * padding + self.shape
+        own_strides = (0,) * padding + self._strides
+        strides = tuple(0 if size == 1 and target != 1 else stride
+                        for size, target, stride in zip(own_shape, shape, own_strides))
+        return self._view(self._offset, shape, strides)
 
 
-    def __mul__(self, scalar: int | float) -> 'Vector':
-        if not isinstance(scalar, (int, float)):
-            raise TypeError("Unsupported operand type(s) for *: 'Vector' and '{}'".format(type(scalar).__name__))
-        
-        if self.dimension == 2:
-            return Vector([[scalar * a for a in row] for row in self.components])
-        return Vector([scalar * a for a in self.components])
-        
+    def __add__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(add, vector)
 
-    def __truediv__(self, scalar: int | float) -> 'Vector':
-        if not isinstance(scalar, (int, float)):
-            raise TypeError("Unsupported operand type(s) for /: 'Vector' and '{}'".format(type(scalar).__name__))
-        
-        if self.dimension == 2:
-            return Vector([[a / scalar for a in row] for row in self.components])
-        return Vector([a / scalar for a in self.components])
-        
 
-    def __rmul__(self, scalar: int | float) -> 'Vector':
-        return self.__mul__(scalar)
-    
+    def __radd__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(add, vector, reflected=True)
+
+
+    def __sub__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(sub, vector)
+
+
+    def __rsub__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(sub, vector, reflected=True)
+
+
+    def __mul__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(mul, vector)
+
+
+    def __rmul__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(mul, vector, reflected=True)
+
+
+    def __truediv__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(truediv, vector)
+
+
+    def __rtruediv__(self, vector: int | float | list | object) -> 'Vector':
+        return self._binary(truediv, vector, reflected=True)
+
 
     def __rdiv__(self, scalar: int | float) -> 'Vector':
         return self.__truediv__(scalar)
+
+
+    def __iadd__(self, vector: int | float | list | object) -> 'Vector':
+        return self._inplace(add, vector)
+
+
+    def __isub__(self, vector: int | float | list | object) -> 'Vector':
+        return self._inplace(sub, vector)
+
+
+    def __imul__(self, vector: int | float | list | object) -> 'Vector':
+        return self._inplace(mul, vector)
+
+
+    def __itruediv__(self, vector: int | float | list | object) -> 'Vector':
+        return self._inplace(truediv, vector)
     
 
     def __neg__(self) -> 'Vector':
-        if self.dimension == 2:
-            return Vector([[-a for a in row] for row in self.components])
-        return Vector([-a for a in self.components])
+        if _lazy_depth:
+            return Expression(neg, (self,), self.shape)
+        return Vector._from_trusted(array('d', [-a for a in self._values()]), self.shape)
 
 
     def __eq__(self, vector: 'Vector') -> bool:
-        vector = Vector(vector) if isinstance(vector, list) else vector
+        vector = _as_vector(vector) if isinstance(vector, (list, Expression)) else vector
         if not isinstance(vector, Vector) or self.shape != vector.shape:
             return False
-        
-        if self.dimension == 2:
-            return all(all(abs(a - b) < 1e-6 for a, b in zip(row1, row2)) for row1, row2 in zip(self.components, vector.components))
+        return all(abs(a - b) < 1e-6 for a, b in zip(self._values(), vector._values()))
+
+
+    def _locate(self, index: int | tuple | slice) -> tuple:
+        """Resolves an index into (offset, shape, strides, collapsed).
+        collapsed holds one flag per axis that was selected with an integer.
+        """
+        if isinstance(index, tuple):
+            if self.dimension == 1 and len(index) != 1:
+                raise IndexError("Too many indices for array.")
+            if len(index) == 1:
+                index = (index[0], slice(None)) if self.dimension == 2 else index
+            elif len(index) != 2:
+                raise IndexError("Invalid index.")
         else:
-            return all(abs(a - b) < 1e-6 for a, b in zip(self.components, vector.components))
+            index = (index,) if self.dimension == 1 else (index, slice(None))
+
+        offset = self._offset
+        shape, strides, collapsed = [], [], []
+        for axis_index, size, stride in zip(index, self.shape, self._strides):
+            if isinstance(axis_index, slice):
+                start, stop, step = axis_index.indices(size)
+                shape.append(len(range(start, stop, step)))
+                strides.append(stride * step)
+                collapsed.append(False)
+            elif isinstance(axis_index, int):
+                start = axis_index + size if axis_index < 0 else axis_index
+                if not 0 <= start < size:
+                    raise IndexError("Index out of bounds.")
+                shape.append(1)
+                strides.append(stride)
+                collapsed.append(True)
+            else:
+                raise TypeError("Index must be an integer, tuple, or a slice.")
+            offset += start * stride
+        return offset, tuple(shape), tuple(strides), tuple(collapsed)
 
 
     def __getitem__(self, index: int | tuple | slice) -> int | float | object:
+        """Returns an element, or a Vector for a selection of elements.
+        Slices of a 1D vector are copies. Rows, columns and blocks of a matrix
+        are views sharing its buffer, so writes through them reach the matrix
+        and later writes to the matrix show through them. In particular the
+        tuple swap A[0], A[1] = A[1], A[0] leaves row 1 in both rows; use
+        swap_rows, or copy the rows first.
+        """
         if not isinstance(index, (int, tuple, slice)):
             raise TypeError("Index must be an integer, tuple, or a slice.")
         
-        if self.dimension == 2:
-            if isinstance(index, tuple):
-                row_index, col_index = index if len(index) == 2 else (index[0], slice(None))
-
-                # Convert integers to slices for consistent handling
-                row_slice = row_index if isinstance(row_index, slice) else slice(row_index, row_index + 1)
-                col_slice = col_index if isinstance(col_index, slice) else slice(col_index, col_index + 1)
-                
-                # Adjust slices to handle None values
-                row_slice = slice(*row_slice.indices(len(self.components)))
-                col_slice = slice(*col_slice.indices(len(self.components[0])))
-                
-                # Check for out-of-bounds access
-                if (row_slice.start >= len(self.components) or row_slice.stop > len(self.components) or
-                    col_slice.start >= len(self.components[0]) or col_slice.stop > len(self.components[0])):
-                    raise IndexError("Index out of bounds.")
-                
-                # Perform slicing
-                sliced = [row[col_slice] for row in self.components[row_slice]]
-                if row_slice.stop - row_slice.start == 1 and col_slice.stop - col_slice.start == 1:
-                    return sliced[0][0]  # Return a single element
-                elif row_slice.stop - row_slice.start == 1:
-                    return Vector(sliced[0])  # Return a row vector
-                elif col_slice.stop - col_slice.start == 1:
-                    return Vector([row[0] for row in sliced])  # Return a column vector
-                
-                return Vector(sliced)  # Return a matrix (2D slice)
-            
-            return Vector(self.components[index])  # Index is a slice or int
+        offset, shape, strides, collapsed = self._locate(index)
+        if self.dimension == 1:
+            if collapsed[0]:
+                return float(self._data[offset])
+            return self._view(offset, shape, strides).copy()
+
+        if not isinstance(index, tuple):
+            if collapsed[0]:
+                return self._view(offset, shape[1:], strides[1:])  # Return a row
+            return self._view(offset, shape, strides)  # Return a block of rows
         
-        else:  # 1D vector
-            if isinstance(index, tuple):
-                if len(index) != 1:
-                    raise IndexError("Too many indices for array.")
-                index = index[0]
-            return self.components[index]
+        # Tuple indices treat single-element slices like integers
+        for axis_index, size in zip(index, self.shape):
+            if isinstance(axis_index, slice) and axis_index.indices(size)[0] >= size:
+                raise IndexError("Index out of bounds.")
+        rows, cols = shape
+        if rows == 1 and cols == 1:
+            return float(self._data[offset])  # Return a single element
+        elif rows == 1:
+            return self._view(offset, (cols,), strides[1:])  # Return a row vector
+        elif cols == 1:
+            return self._view(offset, (rows,), strides[:1])  # Return a column vector
+        
+        return self._view(offset, shape, strides)  # Return a matrix (2D slice)
 
 
     def __setitem__(self, index: int | tuple | slice, value: int | float | list | object) -> None:
         if not isinstance(index, (int, tuple, slice)):
             raise TypeError("Index must be an integer, tuple, or slice.")
-        value = value.components if isinstance(value, Vector) else value
         
-        if self.dimension == 2:
-            if isinstance(index, tuple):
-                if len(index) == 1:
-                    if isinstance(value, list) and len(value) != len(self.components[index[0]]):
-                        raise ValueError("Value must have the same number of columns as the matrix.")
-                    self.components[index[0]] = value
-
-                elif len(index) == 2:
-                    row_index, col_index = index
-                    if isinstance(row_index, slice):
-                        row_start, row_stop, row_step = row_index.indices(len(self.components))
-                        row_slice = slice(row_start, row_stop, row_step)
-                    else:
-                        row_slice = row_index
-                    
-                    if isinstance(col_index, slice):
-                        col_start, col_stop, col_step = col_index.indices(len(self.components[0]))
-                        col_slice = slice(col_start, col_stop, col_step)
-                    else:
-                        col_slice = col_index
-
-                    if isinstance(row_slice, slice) and isinstance(col_slice, slice):
-                        for i, row in enumerate(range(row_slice.start, row_slice.stop, row_slice.step)):
-                            for j, col in enumerate(range(col_slice.start, col_slice.stop, col_slice.step)):
-                                self.components[row][col] = value[i][j]
-                    elif isinstance(row_slice, slice):
-                        for i, row in enumerate(range(row_slice.start, row_slice.stop, row_slice.step)):
-                            self.components[row][col_slice] = value[i]
-                    elif isinstance(col_slice, slice):
-                        for i, col in enumerate(range(col_slice.start, col_slice.stop, col_slice.step)):
-                            self.components[row_slice][col] = value[i]
-                    else:
-                        self.components[row_slice][col_slice] = value
-                else:
-                    raise IndexError("Invalid index.")
-            
-            else: # Index is int or slice
-                if isinstance(value, list) and len(value) != len(self.components[index]):
-                    raise ValueError("Value must have the same number of columns as the matrix.")
-                if isinstance(value, (int, float)):
-                    for i in range(len(self.components[index])):
-                        self.components[index][i] = value
-                else:
-                    self.components[index] = value
-
-        elif self.dimension == 1:
-            if isinstance(index, (int, slice)):
-                self.components[index] = value
-            elif isinstance(index, tuple):
-                if len(index) == 1:
-                    self.components[index[0]] = value
-                raise IndexError("Too many indices for array.")
+        offset, shape, strides, collapsed = self._locate(index)
+        self._touch()
+        if all(collapsed):
+            self._data[offset] = value
+            return
+        
+        target = self._view(offset, shape, strides)
+        if isinstance(value, (int, float)):
+            for position in target._positions():
+                self._data[position] = value
+            return
+
+        values = _as_vector(value)._values()
+        positions = target._positions()
+        if len(values) != len(positions):
+            if self.dimension == 2 and collapsed[0]:
+                raise ValueError("Value must have the same number of columns as the matrix.")
+            raise ValueError("Value must have the same number of elements as the selection.")
+        for position, item in zip(positions, values):
+            self._data[position] = item
+
+
+    def swap_rows(self, i: int, j: int) -> None:
+        """Swaps rows i and j of a matrix in place."""
+        if self.dimension != 2:
+            raise ValueError("Matrix must be 2D.")
+        row_i, row_j = self[i], self[j]
+        values = row_i._values()
+        row_i[:] = row_j
+        row_j[:] = values
 
 
     def __matmul__(self, matrix: 'Vector') -> 'Vector':
@@ -253,7 +449,32 @@ class Vector:
     
 
     def __len__(self) -> int:
-        return len(self.components)
+        return self.shape[0]
+
+
+    def __iter__(self) -> Iterator:
+        """Iterates over the scalars of a 1D vector or the row views of a matrix."""
+        if self.dimension == 1:
+            return iter(self._values())
+        return self.rows()
+
+
+    def rows(self) -> Iterator['Vector']:
+        """Returns an iterator over the rows of a matrix as views."""
+        if self.dimension != 2:
+            raise ValueError("Matrix must be 2D.")
+        rows, cols = self.shape
+        row_stride, col_stride = self._strides
+        return (self._view(self._offset + i * row_stride, (cols,), (col_stride,)) for i in range(rows))
+
+
+    def cols(self) -> Iterator['Vector']:
+        """Returns an iterator over the columns of a matrix as views."""
+        if self.dimension != 2:
+            raise ValueError("Matrix must be 2D.")
+        rows, cols = self.shape
+        row_stride, col_stride = self._strides
+        return (self._view(self._offset + j * col_stride, (rows,), (row_stride,)) for j in range(cols))
 
 
     def __str__(self) -> str:
@@ -271,8 +492,477 @@ class Vector:
     
 
     def copy(self) -> 'Vector':
-        new_components = deepcopy(self.components)
-        return Vector(new_components)
+        return Vector._from_trusted(array('d', self._values()), self.shape)
+
+
+_MATMUL_BLOCK = 16
+_parallel_threshold = 192 ** 3
+_pool = None
+_pool_workers = 0
+_lazy_depth = 0
+_SYMBOLS = {add: '+', sub: '-', mul: '*', truediv: '/'}
+_compiled_kernels = {}
+_SMALL_SIZES = (2, 3, 4)
+_NORM_CACHE_SIZE = 64
+_small_kernels = {}
+_cache_size = 128
+_cache_order = OrderedDict()
+_cache_hits = 0
+_cache_misses = 0
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+SolverResult = namedtuple('SolverResult', ['x', 'converged', 'iterations', 'residuals'])
+
+
+@contextmanager
+def lazy() -> Iterator[None]:
+    """Context manager that makes element-wise arithmetic lazy.
+    Inside the block, +, -, * and / on vectors build an Expression graph
+    instead of a result. The graph is evaluated in one fused pass over the
+    elements when the result is first needed, and reductions such as norm
+    consume it without storing the intermediate values.
+
+    Example usage:
+    >>> with vec.lazy():
+    ...     U_new = 0.5 * (U + vec.inv(U).T)
+    >>> vec.norm(U_new - U)
+    """
+    global _lazy_depth
+    _lazy_depth += 1
+    try:
+        yield
+    finally:
+        _lazy_depth -= 1
+
+
+def _lazy_binary(op, operand1, operand2) -> 'Expression':
+    """Builds an Expression node for a broadcasting element-wise operator."""
+    shapes = [operand.shape for operand in (operand1, operand2) if isinstance(operand, (Vector, Expression))]
+    return Expression(op, (operand1, operand2), reduce(_broadcast_shape, shapes))
+
+
+class Expression:
+    """Unevaluated element-wise arithmetic on vectors, produced inside lazy().
+    op - Operator applied to the operands (operator.add, sub, mul, truediv or neg).
+    operands - Vectors, scalars or other Expressions.
+    shape - Broadcast shape of the result.
+
+    Expressions support the same arithmetic as vectors. Any other use, such as
+    indexing, iteration or passing one to a vector function, evaluates the
+    graph once and reuses the result.
+    """
+    __slots__ = ('op', 'operands', 'shape', '_value')
+
+    def __init__(self, op, operands: tuple, shape: tuple) -> None:
+        self.op = op
+        self.operands = operands
+        self.shape = shape
+        self._value = None
+
+
+    @property
+    def dimension(self) -> int:
+        return len(self.shape)
+
+
+    def _source(self) -> tuple[str, list]:
+        """Returns the source of a lambda computing one element of the graph,
+        together with the leaf operands it takes as arguments.
+        """
+        leaves = []
+
+        def emit(node) -> str:
+            if isinstance(node, Expression):
+                if node.op is neg:
+                    return "(-{})".format(emit(node.operands[0]))
+                first, second = node.operands
+                return "({} {} {})".format(emit(first), _SYMBOLS[node.op], emit(second))
+            leaves.append(node)
+            return "x{}".format(len(leaves) - 1)
+        
+        body = emit(self)
+        arguments = ", ".join("x{}".format(i) for i in range(len(leaves)))
+        return "lambda {}: {}".format(arguments, body), leaves
+
+
+    def _stream(self) -> Iterator[float]:
+        """Yields the elements of the result in row-major order in a single fused pass."""
+        source, leaves = self._source()
+        kernel = _compiled_kernels.get(source)
+        if kernel is None:
+            kernel = _compiled_kernels[source] = eval(source)
+        columns = [leaf._broadcast_to(self.shape)._values() if isinstance(leaf, Vector) else repeat(leaf)
+                   for leaf in leaves]
+        return map(kernel, *columns)
+
+
+    def evaluate(self, out: Vector | None = None) -> Vector:
+        """Evaluates the graph. Without out, the result is computed once and cached.
+        out - Optional vector that receives the result in place.
+        """
+        if out is not None:
+            return _backend.evaluate(self, out)
+        if self._value is None:
+            self._value = _backend.evaluate(self)
+        return self._value
+
+
+    def _binary(self, op, other, reflected: bool = False) -> 'Expression':
+        other = Vector(other) if isinstance(other, list) else other
+        if not isinstance(other, (int, float, Vector, Expression)):
+            return NotImplemented
+        return _lazy_binary(op, other, self) if reflected else _lazy_binary(op, self, other)
+
+
+    def __add__(self, other) -> 'Expression':
+        return self._binary(add, other)
+
+
+    def __radd__(self, other) -> 'Expression':
+        return self._binary(add, other, reflected=True)
+
+
+    def __sub__(self, other) -> 'Expression':
+        return self._binary(sub, other)
+
+
+    def __rsub__(self, other) -> 'Expression':
+        return self._binary(sub, other, reflected=True)
+
+
+    def __mul__(self, other) -> 'Expression':
+        return self._binary(mul, other)
+
+
+    def __rmul__(self, other) -> 'Expression':
+        return self._binary(mul, other, reflected=True)
+
+
+    def __truediv__(self, other) -> 'Expression':
+        return self._binary(truediv, other)
+
+
+    def __rtruediv__(self, other) -> 'Expression':
+        return self._binary(truediv, other, reflected=True)
+
+
+    def __neg__(self) -> 'Expression':
+        return Expression(neg, (self,), self.shape)
+
+
+    def __matmul__(self, matrix) -> Vector:
+        return matmul(self, matrix)
+
+
+    def __rmatmul__(self, matrix) -> Vector:
+        return matmul(matrix, self)
+
+
+    def __eq__(self, vector) -> bool:
+        return self.evaluate() == vector
+
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+
+    def __iter__(self) -> Iterator:
+        return iter(self.evaluate())
+
+
+    def __getitem__(self, index: int | tuple | slice) -> int | float | Vector:
+        return self.evaluate()[index]
+
+
+    def __getattr__(self, name: str):
+        return getattr(self.evaluate(), name)
+
+
+    def __str__(self) -> str:
+        return str(self.evaluate())
+
+
+    def __repr__(self) -> str:
+        return repr(self.evaluate())
+
+
+def _as_vector(vector: Vector | Expression | list) -> Vector:
+    """Returns vector as a Vector, evaluating expressions and converting lists."""
+    if isinstance(vector, Vector):
+        return vector
+    if isinstance(vector, Expression):
+        return vector.evaluate()
+    return Vector(vector)
+
+
+def _size(shape: tuple) -> int:
+    """Returns the number of elements in a 1D or 2D shape."""
+    return shape[0] * shape[1] if len(shape) == 2 else shape[0]
+
+
+def _result(values, shape: tuple, out: Vector | None) -> Vector:
+    """Wraps kernel output as a new vector, or writes it into out when one is given."""
+    if out is None:
+        return Vector._from_trusted(array('d', values), shape)
+    _check_out(out, shape)
+    out._write(values)
+    return out
+
+
+def _check_out(out: Vector, shape: tuple) -> None:
+    """Validates an out argument and marks it as about to be overwritten."""
+    if not isinstance(out, Vector):
+        raise TypeError("out must be of type 'Vector'.")
+    if out.shape != shape:
+        raise ValueError("out must have shape {}, got {}.".format(shape, out.shape))
+    out._touch()
+
+
+def _broadcast_shape(shape1: tuple, shape2: tuple) -> tuple:
+    """Returns the shape two operands broadcast to, following NumPy's rules."""
+    ndim = max(len(shape1), len(shape2))
+    shape1 = (1,) * (ndim - len(shape1)) + shape1
+    shape2 = (1,) * (ndim - len(shape2)) + shape2
+    if any(a != b and a != 1 and b != 1 for a, b in zip(shape1, shape2)):
+        raise ValueError("Vectors of shapes {} and {} cannot be broadcast together.".format(shape1, shape2))
+    return tuple(b if a == 1 else a for a, b in zip(shape1, shape2))
+
+
+def _matmul_panels(rows: list, columns: list) -> list:
+    """Multiplies the given rows by the given packed columns, sweeping panels of
+    columns so each panel is reused by every row while it is hot.
+    Returns the products in row-major order.
+    """
+    n = len(columns)
+    values = [0.0] * (len(rows) * n)
+    for j in range(0, n, _MATMUL_BLOCK):
+        panel = columns[j:j + _MATMUL_BLOCK]
+        for i, row in enumerate(rows):
+            start = i * n + j
+            values[start:start + len(panel)] = [sum(map(mul, row, column)) for column in panel]
+    return values
+
+
+def set_parallel_threshold(operations: int) -> None:
+    """Sets the number of multiply-adds (m * k * n) from which matrix products
+    run on a process pool when no explicit worker count is given.
+    """
+    global _parallel_threshold
+    _parallel_threshold = operations
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Returns a process pool with the given number of workers, reusing the
+    previous pool when the size matches.
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+    return _pool
+
+
+def _parallel_matmul(a: list, packed: list, m: int, k: int, n: int, workers: int) -> array:
+    """Computes a matrix product on a process pool.
+    The left operand, the packed right operand and the result share one block of
+    shared memory; each worker fills a contiguous band of result rows with the
+    serial kernel, so the result is identical to the serial one.
+    """
+    memory = SharedMemory(create=True, size=max(8 * (m * k + n * k + m * n), 8))
+    try:
+        with memory.buf.cast('d') as buffer:
+            buffer[:m * k] = array('d', a)
+            buffer[m * k:m * k + n * k] = array('d', packed)
+            bounds = [m * part // workers for part in range(workers + 1)]
+            futures = [_get_pool(workers).submit(_matmul_band, memory.name, m, k, n, start, stop)
+                       for start, stop in zip(bounds, bounds[1:]) if start < stop]
+            for future in futures:
+                future.result()
+            return array('d', buffer[m * k + n * k:m * k + n * k + m * n].tobytes())
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def _matmul_band(name: str, m: int, k: int, n: int, start: int, stop: int) -> None:
+    """Worker task for _parallel_matmul: computes result rows start to stop."""
+    memory = SharedMemory(name=name)
+    try:
+        with memory.buf.cast('d') as buffer:
+            rows = [buffer[i * k:(i + 1) * k].tolist() for i in range(start, stop)]
+            columns = [buffer[m * k + j * k:m * k + (j + 1) * k].tolist() for j in range(n)]
+            offset = m * k + n * k
+            buffer[offset + start * n:offset + stop * n] = array('d', _matmul_panels(rows, columns))
+    finally:
+        memory.close()
+
+
+def set_cache_size(entries: int) -> None:
+    """Sets how many derived results (LU factors, determinants, inverses and
+    norms) are kept across all vectors. The least recently used are evicted
+    first; 0 disables caching.
+    """
+    global _cache_size
+    _cache_size = entries
+    _evict()
+
+
+def cache_info() -> CacheInfo:
+    """Returns the hit and miss counts and the size of the derived-result cache."""
+    return CacheInfo(_cache_hits, _cache_misses, _cache_size, len(_cache_order))
+
+
+def clear_cache() -> None:
+    """Drops every cached derived result and resets the counters."""
+    global _cache_hits, _cache_misses
+    while _cache_order:
+        (_, kind), ref = _cache_order.popitem()
+        vector = ref()
+        if vector is not None and vector._cache:
+            vector._cache.pop(kind, None)
+    _cache_hits = _cache_misses = 0
+
+
+def _cached(vector: Vector, kind: str, compute):
+    """Returns the result of compute() for vector, reusing the cached result of
+    the same kind while the vector's version is unchanged.
+    """
+    global _cache_hits, _cache_misses
+    version, key = vector.version, (id(vector), kind)
+    entry = vector._cache.get(kind) if vector._cache else None
+    if entry is not None:
+        if entry[0] == version:
+            _cache_hits += 1
+            _cache_order.move_to_end(key)
+            return entry[1]
+        del vector._cache[kind]
+        _cache_order.pop(key, None)
+
+    _cache_misses += 1
+    value = compute()
+    if _cache_size > 0:
+        if vector._cache is None:
+            vector._cache = {}
+        vector._cache[kind] = (version, value)
+        _cache_order[key] = weakref.ref(vector, partial(_forget, key))
+        _evict()
+    return value
+
+
+def _forget(key: tuple, ref: weakref.ref) -> None:
+    """Removes a collected vector's entry from the LRU order."""
+    if _cache_order.get(key) is ref:
+        del _cache_order[key]
+
+
+def _evict() -> None:
+    """Evicts least recently used results until the cache fits its size."""
+    while len(_cache_order) > max(_cache_size, 0):
+        (_, kind), ref = _cache_order.popitem(last=False)
+        vector = ref()
+        if vector is not None and vector._cache:
+            vector._cache.pop(kind, None)
+
+
+def _drop_cached(vector: Vector) -> None:
+    """Drops every result cached for vector."""
+    for kind in vector._cache:
+        _cache_order.pop((id(vector), kind), None)
+    vector._cache = None
+
+
+def _swap_count(pivots: list[int]) -> int:
+    """Returns the number of row swaps recorded in a pivot index vector."""
+    return sum(1 for k, pivot in enumerate(pivots) if pivot != k)
+
+
+def _permutation(pivots: list[int]) -> list[int]:
+    """Returns the row order produced by applying a pivot index vector."""
+    permutation = list(range(len(pivots)))
+    for k, pivot in enumerate(pivots):
+        permutation[k], permutation[pivot] = permutation[pivot], permutation[k]
+    return permutation
+
+
+def _strided(data: array, offset: int, count: int, stride: int) -> list:
+    """Returns count elements of data starting at offset and spaced stride apart."""
+    if stride > 0:
+        return data[offset:offset + count * stride:stride].tolist()
+    if stride == 0:
+        return [float(data[offset])] * count
+    return [data[offset + i * stride] for i in range(count)]
+
+
+def _small_kernel(kind: str, n: int):
+    """Returns a fully unrolled kernel for n x n operands, generated once per size.
+    'matmul' kernels multiply two flat row-major matrices and 'matvec' kernels
+    a flat matrix by a vector; both return the flat result.
+    """
+    kernel = _small_kernels.get((kind, n))
+    if kernel is None:
+        if kind == 'matmul':
+            terms = [" + ".join("a[{}] * b[{}]".format(i * n + k, k * n + j) for k in range(n))
+                     for i in range(n) for j in range(n)]
+        else:
+            terms = [" + ".join("a[{}] * b[{}]".format(i * n + k, k) for k in range(n))
+                     for i in range(n)]
+        kernel = _small_kernels[kind, n] = eval("lambda a, b: [{}]".format(", ".join(terms)))
+    return kernel
+
+
+def _small_det(a: list, n: int) -> float:
+    """Returns the determinant of a flat 2 x 2, 3 x 3 or 4 x 4 matrix by cofactor expansion."""
+    if n == 2:
+        return a[0] * a[3] - a[1] * a[2]
+    if n == 3:
+        return (a[0] * (a[4] * a[8] - a[5] * a[7])
+                - a[1] * (a[3] * a[8] - a[5] * a[6])
+                + a[2] * (a[3] * a[7] - a[4] * a[6]))
+    s, c = _minors_4(a)
+    return s[0] * c[5] - s[1] * c[4] + s[2] * c[3] + s[3] * c[2] - s[4] * c[1] + s[5] * c[0]
+
+
+def _minors_4(a: list) -> tuple[tuple, tuple]:
+    """Returns the 2 x 2 minors of the top two rows and of the bottom two rows
+    of a flat 4 x 4 matrix, the building blocks of its determinant and adjugate.
+    """
+    a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = a
+    return ((a00 * a11 - a10 * a01, a00 * a12 - a10 * a02, a00 * a13 - a10 * a03,
+             a01 * a12 - a11 * a02, a01 * a13 - a11 * a03, a02 * a13 - a12 * a03),
+            (a20 * a31 - a30 * a21, a20 * a32 - a30 * a22, a20 * a33 - a30 * a23,
+             a21 * a32 - a31 * a22, a21 * a33 - a31 * a23, a22 * a33 - a32 * a23))
+
+
+def _small_inv(a: list, n: int) -> list:
+    """Returns the inverse of a flat 2 x 2, 3 x 3 or 4 x 4 matrix as its
+    adjugate divided by the determinant.
+    """
+    if n == 2:
+        det_A = a[0] * a[3] - a[1] * a[2]
+        adjugate = [a[3], -a[1], -a[2], a[0]]
+    elif n == 3:
+        a0, a1, a2, a3, a4, a5, a6, a7, a8 = a
+        c0, c1, c2 = a4 * a8 - a5 * a7, a5 * a6 - a3 * a8, a3 * a7 - a4 * a6
+        det_A = a0 * c0 + a1 * c1 + a2 * c2
+        adjugate = [c0, a2 * a7 - a1 * a8, a1 * a5 - a2 * a4,
+                    c1, a0 * a8 - a2 * a6, a2 * a3 - a0 * a5,
+                    c2, a1 * a6 - a0 * a7, a0 * a4 - a1 * a3]
+    else:
+        a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = a
+        (s0, s1, s2, s3, s4, s5), (c0, c1, c2, c3, c4, c5) = _minors_4(a)
+        det_A = s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0
+        adjugate = [a11 * c5 - a12 * c4 + a13 * c3, -a01 * c5 + a02 * c4 - a03 * c3,
+                    a31 * s5 - a32 * s4 + a33 * s3, -a21 * s5 + a22 * s4 - a23 * s3,
+                    -a10 * c5 + a12 * c2 - a13 * c1, a00 * c5 - a02 * c2 + a03 * c1,
+                    -a30 * s5 + a32 * s2 - a33 * s1, a20 * s5 - a22 * s2 + a23 * s1,
+                    a10 * c4 - a11 * c2 + a13 * c0, -a00 * c4 + a01 * c2 - a03 * c0,
+                    a30 * s4 - a31 * s2 + a33 * s0, -a20 * s4 + a21 * s2 - a23 * s0,
+                    -a10 * c3 + a11 * c1 - a12 * c0, a00 * c3 - a01 * c1 + a02 * c0,
+                    -a30 * s3 + a31 * s1 - a32 * s0, a20 * s3 - a21 * s1 + a22 * s0]
+    if det_A == 0:
+        raise ValueError("Matrix is singular.")
+    return [c / det_A for c in adjugate]
 
 
 def norm(vector: Vector | list) -> float:
@@ -281,6 +971,8 @@ def norm(vector: Vector | list) -> float:
     vector - List of integers or floats representing the vector.
                 Can also be a list of lists for 2D vectors.
     """
+    if isinstance(vector, Expression):
+        return _backend.expression_norm(vector)
     if not isinstance(vector, (Vector, list)):
         raise TypeError("Vector must be of type 'Vector' or 'list'.")
     
@@ -288,59 +980,80 @@ def norm(vector: Vector | list) -> float:
         if not all(isinstance(item, (int, float)) for item in vector):
             raise TypeError("All items in the list must be integers or floats.")
         return sum(a**2 for a in vector)**0.5
-    if vector.dimension == 2:
-        return sum(sum(a**2 for a in row) for row in vector)**0.5
-    return sum(a**2 for a in vector)**0.5
+    # Below _NORM_CACHE_SIZE elements the cache costs more than the sum
+    if prod(vector.shape) <= _NORM_CACHE_SIZE:
+        return _backend.norm(vector)
+    return _cached(vector, 'norm', lambda: _backend.norm(vector))
 
 
 def dot_1d(vector1: Vector, vector2: Vector) -> float:
     if len(vector1) != len(vector2):
         raise ValueError("Vectors must have the same length.")
-    return sum(a * b for a, b in zip(vector1, vector2))
+    return _backend.dot_1d(vector1, vector2)
 
 
-def dot_2d(vector1: Vector, vector2: Vector) -> Vector:
+def dot_2d(vector1: Vector, vector2: Vector, out: Vector | None = None, workers: int | None = None) -> Vector:
     if vector1.shape[1] != vector2.shape[0]:
         raise ValueError("Vectors are not correct dimensions for dot product.")
-    
-    return Vector([[sum(a * b for a, b in zip(row, col)) for col in zip(*vector2)] for row in vector1])
+    n = vector1.shape[0]
+    if n in _SMALL_SIZES and vector1.shape == vector2.shape == (n, n):
+        return _result(_small_kernel('matmul', n)(vector1._values(), vector2._values()), (n, n), out)
+    return _backend.matmul_2d(vector1, vector2, out, workers)
+
+
+def _matvec(matrix: Vector, vector: Vector, out: Vector | None = None) -> Vector:
+    if matrix.shape[1] != vector.shape[0]:
+        raise ValueError("Vectors are not correct dimensions for dot product.")
+    n = matrix.shape[0]
+    if n in _SMALL_SIZES and matrix.shape == (n, n):
+        return _result(_small_kernel('matvec', n)(matrix._values(), vector._values()), (n,), out)
+    return _backend.matvec(matrix, vector, out)
 
 
-def dot(vector1: Vector | list, vector2: Vector | list) -> float:
-    """Returns the dot product of two vectors."""
-    vector1 = vector1 if isinstance(vector1, Vector) else Vector(vector1)
-    vector2 = vector2 if isinstance(vector2, Vector) else Vector(vector2)
+def dot(vector1: Vector | list, vector2: Vector | list, out: Vector | None = None, workers: int | None = None) -> float:
+    """Returns the dot product of two vectors.
+    out - Optional vector that receives a matrix or vector result in place.
+    workers - Processes used for a matrix-matrix product. None picks one per
+                CPU above the parallel threshold and runs serially below it.
+    """
+    if isinstance(vector1, SparseMatrix) or isinstance(vector2, SparseMatrix):
+        return _sparse_product(vector1, vector2, out)
+    vector1 = _as_vector(vector1)
+    vector2 = _as_vector(vector2)
 
     if vector1.dimension == 1 and vector2.dimension == 1:
+        if out is not None:
+            raise ValueError("out cannot receive a scalar result.")
         return dot_1d(vector1, vector2)
     elif vector1.dimension == 2 and vector2.dimension == 2:
-        return dot_2d(vector1, vector2)
+        return dot_2d(vector1, vector2, out, workers)
     elif vector1.dimension == 2 and vector2.dimension == 1:
-        if vector1.shape[1] != vector2.shape[0]:
-            raise ValueError("Vectors are not correct dimensions for dot product.")
-        return Vector([sum(a * b for a, b in zip(row, vector2)) for row in vector1])
+        return _matvec(vector1, vector2, out)
     elif vector1.dimension == 1 and vector2.dimension == 2:
         raise ValueError("Vectors are not correct dimensions for dot product.")
     
 
-def matmul(vector1: Vector | list, vector2: Vector | list) -> Vector:
-    """Returns the matrix product of two vectors."""
-    vector1 = vector1 if isinstance(vector1, Vector) else Vector(vector1)
-    vector2 = vector2 if isinstance(vector2, Vector) else Vector(vector2)
+def matmul(vector1: Vector | list, vector2: Vector | list, out: Vector | None = None, workers: int | None = None) -> Vector:
+    """Returns the matrix product of two vectors.
+    out - Optional vector that receives the result in place.
+    workers - Processes used for a matrix-matrix product. None picks one per
+                CPU above the parallel threshold and runs serially below it.
+    """
+    if isinstance(vector1, SparseMatrix) or isinstance(vector2, SparseMatrix):
+        return _sparse_product(vector1, vector2, out)
+    vector1 = _as_vector(vector1)
+    vector2 = _as_vector(vector2)
 
     if vector1.dimension == 1 and vector2.dimension == 1:
-        return Vector([dot_1d(vector1, vector2)])
+        return _result([dot_1d(vector1, vector2)], (1,), out)
     elif vector1.dimension == 2 and vector2.dimension == 2:
-        return dot_2d(vector1, vector2)
+        return dot_2d(vector1, vector2, out, workers)
     if vector1.dimension == 2 and vector2.dimension == 1:
-        if vector1.shape[1] != vector2.shape[0]:
-            raise ValueError("Vectors are not correct dimensions for dot product.")
-        return Vector([sum(a * b for a, b in zip(row, vector2)) for row in vector1])
+        return _matvec(vector1, vector2, out)
     if vector1.dimension == 1 and vector2.dimension == 2:
-        vector1, vector2 = vector2, vector1
-        if vector1.shape[1] != vector2.shape[0]:
+        if vector1.shape[0] != vector2.shape[0]:
             raise ValueError("Vectors are not correct dimensions for dot product.")
-        return Vector([sum(a * b for a, b in zip(vector2, col)) for col in zip(*vector1)])
+        return _backend.vecmat(vector1, vector2, out)
 
 
 def cross(vector1: Vector | list, vector2: Vector | list) -> Vector:
@@ -348,174 +1061,1482 @@ def cross(vector1: Vector | list, vector2: Vector | list) -> Vector:
     vector1 - First vector.
     vector2 - Second vector.
     """
-    vector1 = vector1 if isinstance(vector1, Vector) else Vector(vector1)
-    vector2 = vector2 if isinstance(vector2, Vector) else Vector(vector2)
+    vector1 = _as_vector(vector1)
+    vector2 = _as_vector(vector2)
 
     if vector1.dimension == 1 and vector2.dimension == 1:
         if len(vector1) != 3 or len(vector2) != 3:
             raise ValueError("Vectors must be 3D.")
-        return Vector([vector1[1] * vector2[2] - vector1[2] * vector2[1],
-                       vector1[2] * vector2[0] - vector1[0] * vector2[2],
-                       vector1[0] * vector2[1] - vector1[1] * vector2[0]])
+        return _backend.cross(vector1, vector2)
     raise ValueError("Given vectors cannot be matrices.")
 
 
 def argmax(vector: Vector | list) -> int:
     """Returns the index of the maximum value in the vector."""
-    vector = vector if isinstance(vector, Vector) else Vector(vector)
+    vector = _as_vector(vector)
     if vector.dimension == 2:
         raise ValueError("Given vector cannot be a matrix.")
-    return max(range(len(vector)), key=lambda i: vector[i])
+    values = vector._values()
+    return max(range(len(values)), key=values.__getitem__)
 
 
 def zeros(shape: tuple | int) -> Vector:
     """Returns a zero vector or matrix of the given shape."""
     if not isinstance(shape, tuple):
         shape = (shape,)
-    if len(shape) == 1:
-        return Vector([0 for _ in range(shape[0])])
-    return Vector([[0 for _ in range(shape[1])] for _ in range(shape[0])])
+    return Vector._from_trusted(array('d', [0.0]) * _size(shape), shape)
 
 
 def ones(shape: tuple | int) -> Vector:
     """Returns a vector or matrix of ones of the given shape."""
     if not isinstance(shape, tuple):
         shape = (shape,)
-    if len(shape) == 1:
-        return Vector([1 for _ in range(shape[0])])
-    return Vector([[1 for _ in range(shape[1])] for _ in range(shape[0])])
+    return Vector._from_trusted(array('d', [1.0]) * _size(shape), shape)
 
 
 def eye(n: int) -> Vector:
     """Returns the identity matrix of size n x n."""
-    return Vector([[1 if i == j else 0 for j in range(n)] for i in range(n)])
+    data = array('d', [0.0]) * (n * n)
+    data[::n + 1] = array('d', [1.0]) * n
+    return Vector._from_trusted(data, (n, n))
 
 
-def absolute(vector: Vector | list) -> Vector:
-    """Returns the absolute value of the given vector."""
-    vector = vector if isinstance(vector, Vector) else Vector(vector)
-    if vector.dimension == 2:
-        return Vector([[abs(a) for a in row] for row in vector])
-    return Vector([abs(a) for a in vector])
+def absolute(vector: Vector | list, out: Vector | None = None) -> Vector:
+    """Returns the absolute value of the given vector.
+    out - Optional vector that receives the result in place.
+    """
+    vector = _as_vector(vector)
+    return _result(map(abs, vector._values()), vector.shape, out)
+
+
+def apply(func, *vectors: Vector | list | int | float, out: Vector | None = None) -> Vector:
+    """Applies func to aligned elements of the given vectors in a single pass.
+    Operands are broadcast against each other like the arithmetic operators,
+    so scalars, rows and columns are repeated without building temporaries.
+    func - Callable taking one argument per operand, e.g. math.sin or math.hypot.
+    out - Optional vector that receives the result in place.
+
+    Example usage:
+    >>> apply(math.hypot, Vector([3, 5]), 4)
+    Vector([5.0, 6.4031242374328485])
+    """
+    operands = [vector if isinstance(vector, (int, float)) else _as_vector(vector) for vector in vectors]
+    shapes = [operand.shape for operand in operands if isinstance(operand, Vector)]
+    if not shapes:
+        raise ValueError("apply needs at least one vector operand.")
+    
+    shape = reduce(_broadcast_shape, shapes)
+    columns = [operand._broadcast_to(shape)._values() if isinstance(operand, Vector) else repeat(operand)
+               for operand in operands]
+    return _result(map(func, *columns), shape, out)
+
+
+def lu_packed(vector: Vector | list, overwrite: bool = False) -> tuple[Vector, list[int]]:
+    """Factors an n x n matrix as P A = L U with partial pivoting (Doolittle).
+    vector - List of lists representing the matrix.
+    overwrite - Store the factors in the given matrix's buffer instead of a copy.
+    Returns the packed factors and the pivot indices. L sits strictly below the
+    diagonal (its unit diagonal is implied) and U on and above it. Row k was
+    swapped with row pivots[k] at step k, as in LAPACK's getrf.
+    """
+    vector = _as_vector(vector)
+    if vector.dimension != 2 or vector.shape[0] != vector.shape[1]:
+        raise ValueError("Matrix must be a square 2D matrix.")
+    if overwrite:
+        vector._touch()
+        return _backend.lu_packed(vector, overwrite)
+    factor = lu_factor(vector)
+    return factor.LU.copy(), list(factor.pivots)
 
 
 def lu_decomposition(vector: Vector | list) -> tuple[Vector, Vector, Vector, int]:
     """Returns the LU decomposition of an n x n matrix.
     vector - List of lists representing the matrix.
-    Returns a tuple of three matrices, L, U, and P, and an int swap_count.   
+    Returns a tuple of three matrices, L, U, and P, and an int swap_count,
+    with P A = L U. Unpacks the factors computed by lu_packed.
     """
-    vector = vector if isinstance(vector, Vector) else Vector(vector)
+    LU, pivots = lu_packed(vector)
+    n = LU.shape[0]
+    packed = LU._values()
+    L, U, P = eye(n), zeros((n, n)), zeros((n, n))
+    for i in range(n):
+        L._data[i * n:i * n + i] = array('d', packed[i * n:i * n + i])
+        U._data[i * n + i:(i + 1) * n] = array('d', packed[i * n + i:(i + 1) * n])
+
+    for i, row in enumerate(_permutation(pivots)):
+        P._data[i * n + row] = 1.0
+
+    return L, U, P, _swap_count(pivots)
+
+
+class LUFactor:
+    """A reusable LU factorization of an n x n matrix, created by lu_factor.
+    Solves any number of systems against the matrix without refactorizing it.
+    LU - Packed factors from lu_packed.
+    pivots - Pivot indices from lu_packed.
+    """
+    __slots__ = ('LU', 'pivots', 'shape', '_permutation', '_rows')
+
+    def __init__(self, LU: Vector, pivots: list[int]) -> None:
+        self.LU = LU
+        self.pivots = pivots
+        self.shape = LU.shape
+        self._permutation = _permutation(pivots)
+        self._rows = None
+
+
+    def solve(self, b: Vector | list) -> Vector:
+        """Solves A x = b.
+        b - Right-hand side vector, or a matrix whose columns are right-hand sides.
+        Raises a ValueError if the matrix is singular.
+        """
+        b = _as_vector(b)
+        if b.dimension == 2:
+            return self.solve_many(b)
+        if b.shape != (self.shape[0],):
+            raise ValueError("Right-hand side must match the matrix size.")
+        x = _backend.lu_solve(self, b._view(b._offset, (b.shape[0], 1), (b._strides[0], 0)))
+        return Vector._from_trusted(x._data, b.shape)
+
+
+    def solve_many(self, B: Vector | list) -> Vector:
+        """Solves A X = B for every column of B at once.
+        B - n x m matrix whose columns are right-hand sides.
+        Raises a ValueError if the matrix is singular.
+        """
+        B = _as_vector(B)
+        if B.dimension != 2 or B.shape[0] != self.shape[0]:
+            raise ValueError("Right-hand sides must be an n x m matrix.")
+        return _backend.lu_solve(self, B)
+
+
+    def det(self) -> float:
+        """Returns the determinant of the factored matrix."""
+        det_A = -1.0 if _swap_count(self.pivots) % 2 == 1 else 1.0
+        for diagonal in self.LU._values()[::self.shape[0] + 1]:
+            det_A *= diagonal
+        return det_A if abs(det_A) > 1e-12 else 0.0
+
+
+    def inv(self, out: Vector | None = None) -> Vector:
+        """Returns the inverse of the factored matrix.
+        out - Optional matrix that receives the inverse in place.
+        Raises a ValueError if the matrix is singular.
+        """
+        inverse = self.solve_many(eye(self.shape[0]))
+        if out is not None:
+            return _result(inverse._values(), inverse.shape, out)
+        return inverse
+
+
+def lu_factor(vector: Vector | list) -> LUFactor:
+    """Factors an n x n matrix once for repeated solves.
+    The factorization is cached on the matrix until it is next modified, so the
+    returned object is shared and should be treated as read-only.
+    vector - List of lists representing the matrix.
+    """
+    vector = _as_vector(vector)
     if vector.dimension != 2 or vector.shape[0] != vector.shape[1]:
         raise ValueError("Matrix must be a square 2D matrix.")
-    
-    n = vector.shape[0]
-    P = eye(n)
-    L = eye(n)
-    U = vector.copy()
-    PF = eye(n)
-    LF = zeros((n, n))
-    swap_count = 0
-
-    for k in range(n-1):
-        max_index = argmax(absolute(U[:, 0])) + k
-        if max_index != k:
-            P = eye(n)
-            P[max_index][k:n], P[k][k:n] = P[k][k:n], P[max_index][k:n]
-            U[max_index][k:n], U[k][k:n] = U[k][k:n], U[max_index][k:n]
-            PF = dot(P, PF)
-            LF = dot(P, LF)
-            swap_count += 1
-
-        L = eye(n)
-        for j in range(k+1, n):
-            if U[k][k] != 0:
-                L[j][k] = -(U[j][k] / U[k][k])
-                LF[j][k] = (U[j][k] / U[k][k])
-            else:
-                L[j][k] = 0
-                LF[j][k] = 0
-        U = dot(L, U)
+    return _cached(vector, 'lu', lambda: LUFactor(*_backend.lu_packed(vector)))
 
-    for i in range(n):
-        LF[i, i] = 1
 
-    return LF, U, PF, swap_count
+def solve(vector: Vector | list, b: Vector | list) -> Vector:
+    """Solves A x = b for an n x n matrix A.
+    vector - List of lists representing the matrix.
+    b - Right-hand side vector, or a matrix whose columns are right-hand sides.
+    Use lu_factor when solving several systems against the same matrix.
+    """
+    return lu_factor(vector).solve(b)
 
 
 def det(vector: Vector | list) -> float:
     """Calculates the determinant of an n x n matrix.
-    Uses the LU decomposition method.
+    Uses cofactor expansion up to 4 x 4 and the LU decomposition method otherwise.
     vector - List of lists representing the matrix.
     """
-    vector = vector if isinstance(vector, Vector) else Vector(vector)
-    tol = 1e-12
+    vector = _as_vector(vector)
     if vector.dimension == 1:
         raise ValueError("Matrix must be 2D.")
     elif vector.shape[0] != vector.shape[1]:
         raise ValueError("Matrix must be square.")
-    
-    _, U, _, swap_count = lu_decomposition(vector)
-    diag_U = [U[i][i] for i in range(len(U))]
-    det_U = 1
-    for i in range(len(U)):
-        det_U *= diag_U[i]
-
-    # Adjust the determinant if an odd number of row swaps were performed
-    if swap_count % 2 == 1:
-        det_U *= -1
-
-    return det_U if abs(det_U) > tol else 0.0
+    n = vector.shape[0]
+    if n in _SMALL_SIZES:
+        det_A = _small_det(vector._values(), n)
+        return det_A if abs(det_A) > 1e-12 else 0.0
+    return _cached(vector, 'det', lambda: _backend.det(vector))
     
 
-def inv(vector: Vector | list) -> Vector:
+def inv(vector: Vector | list, out: Vector | None = None) -> Vector:
     """Calculates the inverse of an n x n matrix.
     vector - List of lists representing the matrix.
+    out - Optional matrix that receives the inverse in place.
     Raises a ValueError if the matrix is singular.
     """
-    vector = vector if isinstance(vector, Vector) else Vector(vector)
+    vector = _as_vector(vector)
     if vector.dimension == 1:
         raise ValueError("Matrix must be 2D.")
     elif vector.shape[0] != vector.shape[1]:
         raise ValueError("Matrix must be square.")
-
     n = vector.shape[0]
-    I = eye(n)
-    inv = zeros((n, n))
-    L, U, P, _ = lu_decomposition(vector)
+    if n in _SMALL_SIZES:
+        return _result(_small_inv(vector._values(), n), (n, n), out)
+    inverse = _cached(vector, 'inv', lambda: _backend.inv(vector))
+    if out is not None:
+        return _result(inverse._values(), inverse.shape, out)
+    return inverse.copy()
+
+
+def polar(vector: Vector | list, tol: float = 1e-12, maxiter: int = 100) -> tuple[Vector, Vector, int]:
+    """Computes the polar decomposition A = U H of a nonsingular n x n matrix,
+    where U is orthogonal and H is symmetric positive definite.
+    Uses the Newton iteration U <- (gamma U + U^-T / gamma) / 2 with Higham's
+    Frobenius-norm scaling gamma, which is dropped once the iterates are close
+    so that the last steps converge quadratically.
+    vector - List of lists representing the matrix.
+    tol - Tolerance on the change between iterates relative to their norm.
+    maxiter - Maximum number of iterations. The current iterate is returned
+                once it is reached, even if the tolerance was not met.
+    Returns U, H and the number of iterations taken.
+    """
+    vector = _as_vector(vector)
+    if vector.dimension != 2 or vector.shape[0] != vector.shape[1]:
+        raise ValueError("Matrix must be a square 2D matrix.")
+    n = vector.shape[0]
+    X = vector._values()
+    scaled = True
+    iterations = 0
+
+    while iterations < maxiter:
+        iterations += 1
+        if n in _SMALL_SIZES:
+            Y = _small_inv(X, n)
+        else:
+            Y = inv(Vector._from_trusted(array('d', X), (n, n)))._values()
+        gamma = sqrt(sqrt(sum(y * y for y in Y) / sum(x * x for x in X))) if scaled else 1.0
+        X_new = [0.5 * (gamma * X[i * n + j] + Y[j * n + i] / gamma) for i in range(n) for j in range(n)]
+        change = sqrt(sum((a - b) ** 2 for a, b in zip(X_new, X)))
+        size = sqrt(sum(a * a for a in X_new))
+        X = X_new
+        if change <= tol * size:
+            break
+        if change < 1e-2 * size:
+            scaled = False
+
+    U = Vector._from_trusted(array('d', X), (n, n))
+    H = dot(U.T, vector)
+    H += H.T.copy()
+    H *= 0.5
+    return U, H, iterations
+
+
+def rotation_matrix(axis: Vector | list, theta: float) -> Vector:
+    """Returns the matrix of the counterclockwise rotation by theta radians
+    about axis, built from the unit quaternion (cos(theta/2), sin(theta/2) axis)
+    so that it is orthogonal to machine precision.
+    axis - 3D vector; it does not need to be normalized.
+    theta - Angle in radians.
+    """
+    axis = _as_vector(axis)
+    if axis.shape != (3,):
+        raise ValueError("Axis must be a 3D vector.")
+    x, y, z = axis._values()
+    length = sqrt(x * x + y * y + z * z)
+    if length == 0:
+        raise ValueError("Axis cannot be the zero vector.")
+    a = cos(theta / 2.0)
+    scale = -sin(theta / 2.0) / length
+    b, c, d = x * scale, y * scale, z * scale
+    aa, bb, cc, dd = a * a, b * b, c * c, d * d
+    bc, ad, ac, ab, bd, cd = b * c, a * d, a * c, a * b, b * d, c * d
+    return Vector._from_trusted(array('d', [aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac),
+                                            2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab),
+                                            2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc]), (3, 3))
+
+
+def so3_exp(omega: Vector | list, dt: float = 1.0) -> Vector:
+    """Returns the rotation exp(dt [omega]x) reached by turning at angular
+    velocity omega for time dt: the rotation by |omega| dt about omega.
+    Advancing R = so3_exp(omega, dt) @ R keeps R orthogonal, unlike the
+    Euler step R += dt [omega]x R.
+    omega - 3D angular velocity (or rotation vector when dt is 1).
+    dt - Time step.
+    """
+    omega = _as_vector(omega)
+    if omega.shape != (3,):
+        raise ValueError("omega must be a 3D vector.")
+    theta = _backend.norm(omega) * dt
+    if theta == 0:
+        return eye(3)
+    return rotation_matrix(omega, theta)
+
+
+def so3_log(R: Vector | list) -> Vector:
+    """Returns the rotation vector omega, with |omega| in [0, pi], such that
+    so3_exp(omega) is the rotation matrix R.
+    R - 3 x 3 rotation matrix.
+    """
+    R = _as_vector(R)
+    if R.shape != (3, 3):
+        raise ValueError("Rotation matrix must be 3 x 3.")
+    r = R._values()
+    cos_theta = max(-1.0, min(1.0, (r[0] + r[4] + r[8] - 1) / 2))
+    theta = acos(cos_theta)
+    # R - R^T = 2 sin(theta) [axis]x
+    w = [r[7] - r[5], r[2] - r[6], r[3] - r[1]]
+    if cos_theta >= 0:
+        # theta / (2 sin(theta)), with its series near zero
+        scale = 0.5 + theta * theta / 12 if theta < 1e-4 else theta / (2 * sin(theta))
+        return Vector._from_trusted(array('d', [scale * a for a in w]), (3,))
+
+    # Beyond pi / 2 the symmetric part is better conditioned:
+    # (R + R^T) / 2 - cos(theta) I = (1 - cos(theta)) axis axis^T
+    outer = [[((r[3 * i + j] + r[3 * j + i]) / 2 - (cos_theta if i == j else 0)) / (1 - cos_theta)
+              for j in range(3)] for i in range(3)]
+    k = max(range(3), key=lambda i: outer[i][i])
+    axis = [a / sqrt(outer[k][k]) for a in outer[k]]
+    if sum(map(mul, axis, w)) < 0:
+        axis = [-a for a in axis]
+    return Vector._from_trusted(array('d', [theta * a for a in axis]), (3,))
+
+
+class Quaternion:
+    """A quaternion w + x i + y j + z k. Unit quaternions represent rotations:
+    the rotation by theta about a unit axis is (cos(theta/2), sin(theta/2) axis),
+    matching rotation_matrix. Composing two rotations with * costs 16
+    multiplies instead of the 27 of a 3 x 3 matrix product, and normalize()
+    undoes round-off drift without a polar decomposition.
 
-    def forward_substitution(L, b):
-        y = zeros((n,))
-        for i in range(n):
-            y[i] = b[i] - dot(L[i][:i], y[:i])
-        return y
-    
-    def backward_substitution(U, y):
-        x = zeros((n,))
-        for i in range(n-1, -1, -1):
-            try:
-                x[i] = (y[i] - dot(U[i][i+1:], x[i+1:])) / U[i][i]
-            except:
-                raise ValueError("Matrix is singular.")
-        return x
+    Example usage:
+    >>> half_turn = Quaternion(0, 0, 0, 1)  # pi about the z axis
+    >>> half_turn.rotate(Vector([1, 0, 0]))
+    Vector([-1.0, 0.0, 0.0])
+    """
+    __slots__ = ('w', 'x', 'y', 'z')
+
+    def __init__(self, w: float, x: float, y: float, z: float) -> None:
+        self.w, self.x, self.y, self.z = float(w), float(x), float(y), float(z)
+
+
+    @classmethod
+    def from_axis_angle(cls, axis: Vector | list, theta: float) -> 'Quaternion':
+        """Returns the unit quaternion of the rotation by theta radians about axis."""
+        axis = _as_vector(axis)
+        if axis.shape != (3,):
+            raise ValueError("Axis must be a 3D vector.")
+        x, y, z = axis._values()
+        length = sqrt(x * x + y * y + z * z)
+        if length == 0:
+            raise ValueError("Axis cannot be the zero vector.")
+        scale = sin(theta / 2.0) / length
+        return cls(cos(theta / 2.0), x * scale, y * scale, z * scale)
+
+
+    @classmethod
+    def from_matrix(cls, R: Vector | list) -> 'Quaternion':
+        """Returns the unit quaternion of a 3 x 3 rotation matrix, branching on
+        the largest of w, x, y and z for accuracy (Shepperd's method).
+        """
+        R = _as_vector(R)
+        if R.shape != (3, 3):
+            raise ValueError("Rotation matrix must be 3 x 3.")
+        r00, r01, r02, r10, r11, r12, r20, r21, r22 = R._values()
+        trace = r00 + r11 + r22
+        if trace > max(r00, r11, r22):
+            s = 2.0 * sqrt(1.0 + trace)
+            return cls(0.25 * s, (r21 - r12) / s, (r02 - r20) / s, (r10 - r01) / s)
+        if r00 >= r11 and r00 >= r22:
+            s = 2.0 * sqrt(1.0 + r00 - r11 - r22)
+            return cls((r21 - r12) / s, 0.25 * s, (r01 + r10) / s, (r02 + r20) / s)
+        if r11 >= r22:
+            s = 2.0 * sqrt(1.0 + r11 - r00 - r22)
+            return cls((r02 - r20) / s, (r01 + r10) / s, 0.25 * s, (r12 + r21) / s)
+        s = 2.0 * sqrt(1.0 + r22 - r00 - r11)
+        return cls((r10 - r01) / s, (r02 + r20) / s, (r12 + r21) / s, 0.25 * s)
+
+
+    def to_matrix(self) -> Vector:
+        """Returns the 3 x 3 rotation matrix. Non-unit quaternions are scaled
+        to unit length first.
+        """
+        w, x, y, z = self.w, self.x, self.y, self.z
+        s = 2.0 / (w * w + x * x + y * y + z * z)
+        wx, wy, wz = s * w * x, s * w * y, s * w * z
+        xx, xy, xz = s * x * x, s * x * y, s * x * z
+        yy, yz, zz = s * y * y, s * y * z, s * z * z
+        return Vector._from_trusted(array('d', [1.0 - yy - zz, xy - wz, xz + wy,
+                                                xy + wz, 1.0 - xx - zz, yz - wx,
+                                                xz - wy, yz + wx, 1.0 - xx - yy]), (3, 3))
+
+
+    def __mul__(self, other: 'Quaternion | int | float') -> 'Quaternion':
+        """Hamilton product: (q1 * q2) rotates by q2 first, then by q1."""
+        if isinstance(other, (int, float)):
+            return Quaternion(self.w * other, self.x * other, self.y * other, self.z * other)
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        w1, x1, y1, z1 = self.w, self.x, self.y, self.z
+        w2, x2, y2, z2 = other.w, other.x, other.y, other.z
+        return Quaternion(w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                          w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                          w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                          w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2)
+
+
+    def __rmul__(self, scalar: int | float) -> 'Quaternion':
+        return self * scalar
+
+
+    def __neg__(self) -> 'Quaternion':
+        return Quaternion(-self.w, -self.x, -self.y, -self.z)
+
+
+    def __eq__(self, other: 'Quaternion') -> bool:
+        if not isinstance(other, Quaternion):
+            return False
+        return all(abs(a - b) < 1e-6 for a, b in zip(self, other))
 
-    # Solve for each column of the inverse
-    for i in range(n):
-        Pb = dot(P, [row[i] for row in I])
-        y = forward_substitution(L, Pb)
-        x = backward_substitution(U, y)
-        for j in range(n):
-            inv[j][i] = x[j]
 
-    return inv
+    def __iter__(self) -> Iterator[float]:
+        return iter((self.w, self.x, self.y, self.z))
 
 
-def transpose(vector: Vector | list) -> Vector:
+    def __repr__(self) -> str:
+        return "Quaternion({}, {}, {}, {})".format(self.w, self.x, self.y, self.z)
+
+
+    def conjugate(self) -> 'Quaternion':
+        """Returns the conjugate, which is the inverse rotation for a unit quaternion."""
+        return Quaternion(self.w, -self.x, -self.y, -self.z)
+
+
+    def norm(self) -> float:
+        return sqrt(self.w * self.w + self.x * self.x + self.y * self.y + self.z * self.z)
+
+
+    def normalize(self) -> 'Quaternion':
+        """Returns the quaternion scaled to unit length."""
+        length = self.norm()
+        if length == 0:
+            raise ValueError("Cannot normalize the zero quaternion.")
+        return self * (1.0 / length)
+
+
+    def rotate(self, points: 'Vector | Vec3Array | list') -> 'Vector | Vec3Array':
+        """Rotates a 3D vector, the rows of an N x 3 matrix, or a Vec3Array."""
+        if isinstance(points, Vec3Array):
+            return Mat3Array.from_vectors(self.to_matrix()).transform(points)
+        points = _as_vector(points)
+        if points.dimension == 2:
+            if points.shape[1] != 3:
+                raise ValueError("Points must have 3 columns.")
+            return matmul(points, self.to_matrix().T)
+        if points.shape != (3,):
+            raise ValueError("Vector must be 3D.")
+        # v + 2 u x (u x v + w v), with u the vector part of the unit quaternion
+        q = self.normalize()
+        w, x, y, z = q.w, q.x, q.y, q.z
+        a, b, c = points._values()
+        tx, ty, tz = y * c - z * b + w * a, z * a - x * c + w * b, x * b - y * a + w * c
+        return Vector._from_trusted(array('d', [a + 2 * (y * tz - z * ty),
+                                                b + 2 * (z * tx - x * tz),
+                                                c + 2 * (x * ty - y * tx)]), (3,))
+
+
+def slerp(q0: Quaternion, q1: Quaternion, t: float) -> Quaternion:
+    """Spherical linear interpolation between unit quaternions along the
+    shorter arc, at constant angular speed.
+    t - 0 gives q0 and 1 gives q1.
+    """
+    cos_angle = q0.w * q1.w + q0.x * q1.x + q0.y * q1.y + q0.z * q1.z
+    if cos_angle < 0:
+        q1, cos_angle = -q1, -cos_angle
+    if cos_angle > 0.9995:
+        # Nearly parallel: linear interpolation avoids dividing by sin(angle) ~ 0
+        s0, s1 = 1.0 - t, t
+    else:
+        angle = acos(cos_angle)
+        s0, s1 = sin((1.0 - t) * angle) / sin(angle), sin(t * angle) / sin(angle)
+    result = Quaternion(*(s0 * a + s1 * b for a, b in zip(q0, q1)))
+    return result.normalize() if cos_angle > 0.9995 else result
+
+
+def transpose(vector: Vector | list, out: Vector | None = None) -> Vector:
     """Transposes the given the n x n or m x n matrix.
     Given vectors just return the original vector.
+    The result is a view sharing the matrix's buffer; call .copy() on it
+    for a contiguous matrix.
     vector - List of lists representing the matrix.
+    out - Optional matrix that receives a copy of the transpose instead.
     """
-    vector = vector if isinstance(vector, Vector) else Vector(vector)
-    if vector.dimension == 1:
-        return vector
-    
-    return Vector([list(col) for col in zip(*vector.components)])
+    if isinstance(vector, SparseMatrix):
+        if out is not None:
+            raise ValueError("out cannot receive a sparse result.")
+        return vector.T
+    vector = _as_vector(vector)
+    if out is not None:
+        return _result(vector.T._values(), vector.T.shape, out)
+    return _backend.transpose(vector)
+
+
+class Vec3Array:
+    """A batch of N 3D vectors stored as three contiguous component vectors
+    (structure of arrays). Batched operations run one fused pass over the
+    components instead of one Vector per point.
+    x, y, z - 1D vectors or lists of the same length N.
+
+    Example usage:
+    >>> points = Vec3Array.from_vector(Vector([[1, 0, 0], [0, 3, 4]]))
+    >>> points.norm()
+    Vector([1.0, 5.0])
+    """
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x: Vector | list, y: Vector | list, z: Vector | list) -> None:
+        self.x, self.y, self.z = (_as_vector(component).contiguous() for component in (x, y, z))
+        if not self.x.dimension == self.y.dimension == self.z.dimension == 1 or \
+                not self.x.shape == self.y.shape == self.z.shape:
+            raise ValueError("Components must be 1D vectors of the same length.")
+
+
+    @classmethod
+    def from_vector(cls, points: Vector | list) -> 'Vec3Array':
+        """Builds a batch from an N x 3 matrix, or a single 3D vector as a batch of one."""
+        points = _as_vector(points)
+        if points.dimension == 1:
+            points = points._view(points._offset, (1,) + points.shape, (0,) + points._strides)
+        if points.shape[1] != 3:
+            raise ValueError("Points must have 3 columns.")
+        return cls(*(column.copy() for column in points.cols()))
+
+
+    def to_vector(self) -> Vector:
+        """Returns the batch as an N x 3 matrix."""
+        values = [a for point in zip(self.x._values(), self.y._values(), self.z._values()) for a in point]
+        return Vector._from_trusted(array('d', values), (len(self), 3))
+
+
+    def __len__(self) -> int:
+        return self.x.shape[0]
+
+
+    def __getitem__(self, index: int) -> Vector:
+        return Vector([self.x[index], self.y[index], self.z[index]])
+
+
+    def dot(self, other: 'Vec3Array') -> Vector:
+        """Returns the N dot products with another batch as a 1D vector."""
+        with lazy():
+            return _as_vector(self.x * other.x + self.y * other.y + self.z * other.z)
+
+
+    def cross(self, other: 'Vec3Array') -> 'Vec3Array':
+        """Returns the N cross products with another batch."""
+        with lazy():
+            return Vec3Array(self.y * other.z - self.z * other.y,
+                             self.z * other.x - self.x * other.z,
+                             self.x * other.y - self.y * other.x)
+
+
+    def norm(self) -> Vector:
+        """Returns the N lengths as a 1D vector."""
+        return apply(sqrt, self.dot(self))
+
+
+    def normalize(self) -> 'Vec3Array':
+        """Returns the batch scaled to unit length."""
+        lengths = self.norm()
+        with lazy():
+            return Vec3Array(self.x / lengths, self.y / lengths, self.z / lengths)
+
+
+class Mat3Array:
+    """A batch of N 3 x 3 matrices stored as nine contiguous component vectors
+    in row-major order (structure of arrays). A batch of one broadcasts against
+    a batch of any length, so a single rotation can transform a whole point set.
+    components - Nine 1D vectors or lists of the same length N.
+    """
+    __slots__ = ('components',)
+
+    def __init__(self, components: list) -> None:
+        if len(components) != 9:
+            raise ValueError("A batch of 3 x 3 matrices needs 9 components.")
+        self.components = tuple(_as_vector(component).contiguous() for component in components)
+        shape = self.components[0].shape
+        if any(component.dimension != 1 or component.shape != shape for component in self.components):
+            raise ValueError("Components must be 1D vectors of the same length.")
+
+
+    @classmethod
+    def from_vectors(cls, matrices: Vector | list) -> 'Mat3Array':
+        """Builds a batch from a list of 3 x 3 matrices, or a single 3 x 3 matrix as a batch of one."""
+        if isinstance(matrices, Vector):
+            matrices = [matrices]
+        values = [_as_vector(matrix)._values() for matrix in matrices]
+        if any(len(matrix) != 9 for matrix in values):
+            raise ValueError("Matrices must be 3 x 3.")
+        return cls([Vector._from_trusted(array('d', [matrix[k] for matrix in values]), (len(values),))
+                    for k in range(9)])
+
+
+    def to_vectors(self) -> list[Vector]:
+        """Returns the batch as a list of 3 x 3 matrices."""
+        return [Vector._from_trusted(array('d', matrix), (3, 3))
+                for matrix in zip(*(component._values() for component in self.components))]
+
+
+    def __len__(self) -> int:
+        return self.components[0].shape[0]
+
+
+    def __getitem__(self, index: int) -> Vector:
+        return Vector([[self.components[3 * i + j][index] for j in range(3)] for i in range(3)])
+
+
+    def transform(self, points: Vec3Array) -> Vec3Array:
+        """Returns each matrix applied to the matching point."""
+        m = self.components
+        with lazy():
+            return Vec3Array(m[0] * points.x + m[1] * points.y + m[2] * points.z,
+                             m[3] * points.x + m[4] * points.y + m[5] * points.z,
+                             m[6] * points.x + m[7] * points.y + m[8] * points.z)
+
+
+    def compose(self, other: 'Mat3Array') -> 'Mat3Array':
+        """Returns the matrix products self[i] @ other[i]."""
+        a, b = self.components, other.components
+        with lazy():
+            return Mat3Array([a[3 * i] * b[j] + a[3 * i + 1] * b[3 + j] + a[3 * i + 2] * b[6 + j]
+                              for i in range(3) for j in range(3)])
+
+
+    def __matmul__(self, other: 'Mat3Array | Vec3Array') -> 'Mat3Array | Vec3Array':
+        if isinstance(other, Vec3Array):
+            return self.transform(other)
+        if isinstance(other, Mat3Array):
+            return self.compose(other)
+        return NotImplemented
+
+
+class SparseMatrix:
+    """An m x n matrix that stores only its nonzero elements, in compressed
+    sparse row (CSR) form. Memory and the cost of products scale with the
+    number of nonzeros rather than with m * n.
+    rows, cols, values - Coordinate (COO) triplets: element (rows[k], cols[k])
+                is values[k]. Duplicates are summed and zeros are dropped.
+    shape - Tuple (m, n).
+
+    Products with vectors, matrices and other sparse matrices go through @,
+    dot and matmul.
+
+    Example usage:
+    >>> A = SparseMatrix([0, 1, 1], [0, 0, 2], [2.0, 1.0, 3.0], (2, 3))
+    >>> A @ Vector([1, 1, 1])
+    Vector([2.0, 4.0])
+    """
+    __slots__ = ('shape', 'indptr', 'indices', 'values')
+
+    def __init__(self, rows: list, cols: list, values: list, shape: tuple) -> None:
+        m, n = shape
+        if not len(rows) == len(cols) == len(values):
+            raise ValueError("rows, cols and values must have the same length.")
+        entries = [{} for _ in range(m)]
+        for i, j, value in zip(rows, cols, values):
+            if not (0 <= i < m and 0 <= j < n):
+                raise ValueError("Index ({}, {}) is out of bounds for shape {}.".format(i, j, shape))
+            entries[i][j] = entries[i].get(j, 0.0) + value
+
+        indptr, indices, data = array('q', [0]), array('q'), array('d')
+        for row in entries:
+            for j in sorted(row):
+                if row[j] != 0:
+                    indices.append(j)
+                    data.append(row[j])
+            indptr.append(len(indices))
+        self._set_csr(indptr, indices, data, (m, n))
+
+
+    @classmethod
+    def _from_csr(cls, indptr: array, indices: array, values: array, shape: tuple) -> 'SparseMatrix':
+        """Wraps CSR arrays produced by the library without validating them."""
+        matrix = cls.__new__(cls)
+        matrix._set_csr(indptr, indices, values, shape)
+        return matrix
+
+
+    def _set_csr(self, indptr: array, indices: array, values: array, shape: tuple) -> None:
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.shape = shape
+
+
+    @classmethod
+    def from_vector(cls, vector: Vector | list) -> 'SparseMatrix':
+        """Builds a sparse matrix from the nonzero elements of a dense matrix."""
+        vector = _as_vector(vector)
+        if vector.dimension != 2:
+            raise ValueError("Matrix must be 2D.")
+        m, n = vector.shape
+        values = vector._values()
+        indptr, indices, data = array('q', [0]), array('q'), array('d')
+        for i in range(m):
+            for j, value in enumerate(values[i * n:(i + 1) * n]):
+                if value != 0:
+                    indices.append(j)
+                    data.append(value)
+            indptr.append(len(indices))
+        return cls._from_csr(indptr, indices, data, (m, n))
+
+
+    def to_vector(self) -> Vector:
+        """Returns the matrix as a dense Vector."""
+        m, n = self.shape
+        dense = array('d', [0.0]) * (m * n)
+        indptr, indices, values = self.indptr, self.indices, self.values
+        for i in range(m):
+            for k in range(indptr[i], indptr[i + 1]):
+                dense[i * n + indices[k]] = values[k]
+        return Vector._from_trusted(dense, (m, n))
+
+
+    @property
+    def nnz(self) -> int:
+        """The number of stored nonzero elements."""
+        return len(self.values)
+
+
+    def diagonal(self) -> Vector:
+        """Returns the main diagonal as a dense 1D vector."""
+        diagonal = array('d', [0.0]) * min(self.shape)
+        indptr, indices, values = self.indptr, self.indices, self.values
+        for i in range(len(diagonal)):
+            for k in range(indptr[i], indptr[i + 1]):
+                if indices[k] == i:
+                    diagonal[i] = values[k]
+        return Vector._from_trusted(diagonal, (len(diagonal),))
+
+
+    @property
+    def T(self) -> 'SparseMatrix':
+        """Returns the transpose, built with a counting sort over the columns."""
+        m, n = self.shape
+        indptr, indices, values = self.indptr, self.indices, self.values
+        counts = [0] * (n + 1)
+        for j in indices:
+            counts[j + 1] += 1
+        for j in range(n):
+            counts[j + 1] += counts[j]
+
+        indptr_T = array('q', counts)
+        indices_T, values_T = array('q', [0]) * self.nnz, array('d', [0.0]) * self.nnz
+        following = counts[:-1]
+        for i in range(m):
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                indices_T[following[j]] = i
+                values_T[following[j]] = values[k]
+                following[j] += 1
+        return SparseMatrix._from_csr(indptr_T, indices_T, values_T, (n, m))
+
+
+    def _matmul(self, other: 'SparseMatrix | Vector | list', out: Vector | None = None) -> 'SparseMatrix | Vector':
+        """Returns self @ other."""
+        if isinstance(other, SparseMatrix):
+            if self.shape[1] != other.shape[0]:
+                raise ValueError("Matrices are not correct dimensions for matrix product.")
+            if out is not None:
+                raise ValueError("out cannot receive a sparse result.")
+            return self._matmul_sparse(other)
+        other = _as_vector(other)
+        if other.shape[0] != self.shape[1]:
+            raise ValueError("Vectors are not correct dimensions for dot product.")
+        return _backend.sparse_matmul(self, other, out)
+
+
+    def _rmatmul(self, other: Vector | list, out: Vector | None = None) -> Vector:
+        """Returns other @ self for a dense other, as (self.T @ other.T).T."""
+        other = _as_vector(other)
+        if other.shape[-1] != self.shape[0]:
+            raise ValueError("Vectors are not correct dimensions for dot product.")
+        if other.dimension == 1:
+            return _backend.sparse_matmul(self.T, other, out)
+        product = _backend.sparse_matmul(self.T, other.T).T
+        return _result(product._values(), product.shape, out)
+
+
+    def _matmul_sparse(self, other: 'SparseMatrix') -> 'SparseMatrix':
+        """Multiplies two sparse matrices row by row (Gustavson's algorithm)."""
+        indptr_A, indices_A, values_A = self.indptr, self.indices, self.values
+        indptr_B, indices_B, values_B = other.indptr, other.indices, other.values
+        indptr, indices, data = array('q', [0]), array('q'), array('d')
+        for i in range(self.shape[0]):
+            row = {}
+            for k in range(indptr_A[i], indptr_A[i + 1]):
+                a, middle = values_A[k], indices_A[k]
+                for l in range(indptr_B[middle], indptr_B[middle + 1]):
+                    j = indices_B[l]
+                    row[j] = row.get(j, 0.0) + a * values_B[l]
+            for j in sorted(row):
+                if row[j] != 0:
+                    indices.append(j)
+                    data.append(row[j])
+            indptr.append(len(indices))
+        return SparseMatrix._from_csr(indptr, indices, data, (self.shape[0], other.shape[1]))
+
+
+    def __matmul__(self, other: 'SparseMatrix | Vector | list') -> 'SparseMatrix | Vector':
+        return self._matmul(other)
+
+
+    def __rmatmul__(self, other: Vector | list) -> Vector:
+        return self._rmatmul(other)
+
+
+    def __repr__(self) -> str:
+        return "SparseMatrix(shape={}, nnz={})".format(self.shape, self.nnz)
+
+
+def _sparse_product(operand1, operand2, out: Vector | None = None) -> 'SparseMatrix | Vector':
+    """Returns operand1 @ operand2 when at least one of them is a SparseMatrix."""
+    if isinstance(operand1, SparseMatrix):
+        return operand1._matmul(operand2, out)
+    return operand2._rmatmul(operand1, out)
+
+
+class LinearOperator:
+    """A matrix known only through its product with a vector, for use with the
+    iterative solvers and as a preconditioner.
+    shape - Tuple (m, n).
+    matvec - Callable mapping a length-n Vector to a length-m Vector.
+    """
+    __slots__ = ('shape', 'matvec')
+
+    def __init__(self, shape: tuple, matvec) -> None:
+        self.shape = shape
+        self.matvec = matvec
+
+
+    def __matmul__(self, vector: Vector | list) -> Vector:
+        return _as_vector(self.matvec(_as_vector(vector)))
+
+
+def _as_operator(matrix):
+    """Returns a function computing matrix @ x for a dense or sparse matrix,
+    a LinearOperator or a plain matrix-vector product callable.
+    """
+    if isinstance(matrix, LinearOperator):
+        return lambda x: _as_vector(matrix.matvec(x))
+    if isinstance(matrix, SparseMatrix):
+        return matrix._matmul
+    if callable(matrix):
+        return lambda x: _as_vector(matrix(x))
+    matrix = _as_vector(matrix)
+    return lambda x: _matvec(matrix, x)
+
+
+def jacobi(matrix: Vector | SparseMatrix | list) -> LinearOperator:
+    """Returns the Jacobi (diagonal) preconditioner of a square matrix, an
+    operator that divides by the matrix's diagonal.
+    matrix - Dense Vector, list of lists or SparseMatrix.
+    """
+    if isinstance(matrix, SparseMatrix):
+        diagonal = matrix.diagonal()
+    else:
+        matrix = _as_vector(matrix)
+        n = matrix.shape[0]
+        diagonal = Vector._from_trusted(array('d', matrix._values()[::n + 1]), (n,))
+    if any(a == 0 for a in diagonal._values()):
+        raise ValueError("Jacobi preconditioner needs a nonzero diagonal.")
+    inverse = 1.0 / diagonal
+    return LinearOperator(matrix.shape, lambda r: r * inverse)
+
+
+def ilu0(matrix: Vector | SparseMatrix | list) -> LinearOperator:
+    """Returns the zero fill-in incomplete LU (ILU(0)) preconditioner of a
+    square matrix. L and U keep the sparsity pattern of the matrix, and the
+    returned operator applies (L U)^-1 with one forward and one backward sweep.
+    matrix - SparseMatrix, or a dense Vector or list of lists whose nonzeros
+                give the pattern.
+    """
+    if not isinstance(matrix, SparseMatrix):
+        matrix = SparseMatrix.from_vector(matrix)
+    n = matrix.shape[0]
+    indptr, indices, values = matrix.indptr, matrix.indices, array('d', matrix.values)
+    diagonal = [-1] * n
+    for i in range(n):
+        for k in range(indptr[i], indptr[i + 1]):
+            if indices[k] == i:
+                diagonal[i] = k
+    if -1 in diagonal or any(values[k] == 0 for k in diagonal):
+        raise ValueError("ILU(0) needs a nonzero diagonal.")
+
+    for i in range(1, n):
+        start, stop = indptr[i], indptr[i + 1]
+        position = {indices[k]: k for k in range(start, stop)}
+        for k in range(start, diagonal[i]):
+            column = indices[k]
+            values[k] /= values[diagonal[column]]
+            factor = values[k]
+            for l in range(diagonal[column] + 1, indptr[column + 1]):
+                target = position.get(indices[l])
+                if target is not None:
+                    values[target] -= factor * values[l]
+        if values[diagonal[i]] == 0:
+            raise ValueError("ILU(0) broke down on a zero pivot.")
+
+    def solve(r: Vector) -> Vector:
+        y = r._values()
+        for i in range(n):
+            start = indptr[i]
+            y[i] -= sum(map(mul, values[start:diagonal[i]], map(y.__getitem__, indices[start:diagonal[i]])))
+        for i in range(n - 1, -1, -1):
+            d, stop = diagonal[i], indptr[i + 1]
+            y[i] = (y[i] - sum(map(mul, values[d + 1:stop], map(y.__getitem__, indices[d + 1:stop])))) / values[d]
+        return Vector._from_trusted(array('d', y), (n,))
+
+    return LinearOperator(matrix.shape, solve)
+
+
+def _preconditioner(M, matrix):
+    """Returns a function applying the inverse of the preconditioner M."""
+    if M is None:
+        return Vector.copy
+    if isinstance(M, str):
+        if M not in ('jacobi', 'ilu0'):
+            raise ValueError("Unknown preconditioner '{}'.".format(M))
+        if not isinstance(matrix, (Vector, SparseMatrix, list)):
+            raise ValueError("The '{}' preconditioner needs an explicit Vector or SparseMatrix matrix, "
+                             "not an operator.".format(M))
+        M = jacobi(matrix) if M == 'jacobi' else ilu0(matrix)
+    return _as_operator(M)
+
+
+def _start(matrix, b: Vector | list, x0: Vector | list | None, maxiter: int | None) -> tuple:
+    """Returns the shared setup of the iterative solvers: the operator, the
+    right-hand side, a private copy of the starting guess, the norm of b and
+    the iteration limit.
+    """
+    A = _as_operator(matrix)
+    b = _as_vector(b)
+    x = zeros(b.shape) if x0 is None else _as_vector(x0).copy()
+    return A, b, x, _backend.norm(b) or 1.0, 10 * b.shape[0] if maxiter is None else maxiter
+
+
+def cg(matrix, b: Vector | list, x0: Vector | list | None = None, tol: float = 1e-8,
+       maxiter: int | None = None, M=None) -> SolverResult:
+    """Solves A x = b for a symmetric positive definite A with the
+    preconditioned conjugate gradient method.
+    matrix - Dense Vector, SparseMatrix, LinearOperator or a callable returning A @ x.
+    b - Right-hand side vector.
+    x0 - Starting guess, zero by default. It is not modified.
+    tol - Stop once the residual norm is at most tol times the norm of b.
+    maxiter - Iteration limit, 10 n by default.
+    M - Preconditioner: None, 'jacobi', 'ilu0', or an operator applying M^-1.
+        The named ones are built from the matrix, so they need a Vector or
+        SparseMatrix rather than an operator.
+    Returns a SolverResult with the solution, whether it converged, the number
+    of iterations and the relative residual norm after each iteration.
+    Memory is a few vectors of length n beyond the operator.
+    """
+    A, b, x, b_norm, maxiter = _start(matrix, b, x0, maxiter)
+    precondition = _preconditioner(M, matrix)
+    r = b - A(x)
+    residuals = [_backend.norm(r) / b_norm]
+    if residuals[-1] <= tol:
+        return SolverResult(x, True, 0, residuals)
+    z = precondition(r)
+    p = z.copy()
+    rz = _backend.dot_1d(r, z)
+
+    for iteration in range(1, maxiter + 1):
+        Ap = A(p)
+        alpha = rz / _backend.dot_1d(p, Ap)
+        x += alpha * p
+        r -= alpha * Ap
+        residuals.append(_backend.norm(r) / b_norm)
+        if residuals[-1] <= tol:
+            return SolverResult(x, True, iteration, residuals)
+        z = precondition(r)
+        rz, rz_old = _backend.dot_1d(r, z), rz
+        p *= rz / rz_old
+        p += z
+    return SolverResult(x, False, maxiter, residuals)
+
+
+def bicgstab(matrix, b: Vector | list, x0: Vector | list | None = None, tol: float = 1e-8,
+             maxiter: int | None = None, M=None) -> SolverResult:
+    """Solves A x = b for a general square A with the right-preconditioned
+    biconjugate gradient stabilized method (BiCGSTAB).
+    Arguments and result are as for cg. Stops without converging if the
+    method breaks down.
+    """
+    A, b, x, b_norm, maxiter = _start(matrix, b, x0, maxiter)
+    precondition = _preconditioner(M, matrix)
+    r = b - A(x)
+    residuals = [_backend.norm(r) / b_norm]
+    if residuals[-1] <= tol:
+        return SolverResult(x, True, 0, residuals)
+    shadow = r.copy()
+    rho = alpha = omega = 1.0
+    p, v = zeros(b.shape), zeros(b.shape)
+
+    for iteration in range(1, maxiter + 1):
+        rho, rho_old = _backend.dot_1d(shadow, r), rho
+        if rho == 0:
+            break
+        p -= omega * v
+        p *= (rho / rho_old) * (alpha / omega)
+        p += r
+        p_hat = precondition(p)
+        v = A(p_hat)
+        shadow_v = _backend.dot_1d(shadow, v)
+        if shadow_v == 0:
+            break
+        alpha = rho / shadow_v
+        x += alpha * p_hat
+        r -= alpha * v
+        if _backend.norm(r) / b_norm <= tol:
+            residuals.append(_backend.norm(r) / b_norm)
+            return SolverResult(x, True, iteration, residuals)
+
+        s_hat = precondition(r)
+        t = A(s_hat)
+        t_t = _backend.dot_1d(t, t)
+        omega = _backend.dot_1d(t, r) / t_t if t_t else 0.0
+        x += omega * s_hat
+        r -= omega * t
+        residuals.append(_backend.norm(r) / b_norm)
+        if residuals[-1] <= tol:
+            return SolverResult(x, True, iteration, residuals)
+        if omega == 0:
+            break
+    return SolverResult(x, False, len(residuals) - 1, residuals)
+
+
+def gmres(matrix, b: Vector | list, x0: Vector | list | None = None, tol: float = 1e-8,
+          maxiter: int | None = None, M=None, restart: int = 20) -> SolverResult:
+    """Solves A x = b for a general square A with restarted, right-preconditioned
+    GMRES. Each iteration adds one Krylov vector, and the method restarts from
+    the current solution every restart iterations.
+    restart - Krylov vectors kept between restarts; memory is restart + 2
+                vectors of length n beyond the operator.
+    Other arguments and the result are as for cg.
+    """
+    A, b, x, b_norm, maxiter = _start(matrix, b, x0, maxiter)
+    precondition = _preconditioner(M, matrix)
+    r = b - A(x)
+    residuals = [_backend.norm(r) / b_norm]
+    iteration = 0
+
+    while residuals[-1] > tol and iteration < maxiter:
+        beta = _backend.norm(r)
+        basis = [r / beta]
+        H = []
+        cosines, sines = [], []
+        g = [beta]
+
+        for j in range(min(restart, maxiter - iteration)):
+            w = A(precondition(basis[j]))
+            column = []
+            for v in basis:
+                h = _backend.dot_1d(w, v)
+                w -= h * v
+                column.append(h)
+            h_next = _backend.norm(w)
+            # Apply the earlier Givens rotations, then one that zeroes h_next
+            for i, (c, s) in enumerate(zip(cosines, sines)):
+                column[i], column[i + 1] = c * column[i] + s * column[i + 1], c * column[i + 1] - s * column[i]
+            radius = sqrt(column[j] ** 2 + h_next ** 2)
+            c, s = (column[j] / radius, h_next / radius) if radius else (1.0, 0.0)
+            cosines.append(c)
+            sines.append(s)
+            column[j] = radius
+            g.append(-s * g[j])
+            g[j] *= c
+            H.append(column)
+
+            iteration += 1
+            residuals.append(abs(g[j + 1]) / b_norm)
+            if residuals[-1] <= tol or h_next == 0:
+                break
+            basis.append(w / h_next)
+
+        # Back substitution on the triangular least-squares system
+        y = [0.0] * len(H)
+        for i in range(len(H) - 1, -1, -1):
+            y[i] = (g[i] - sum(H[k][i] * y[k] for k in range(i + 1, len(H)))) / H[i][i]
+        update = zeros(b.shape)
+        for y_i, v in zip(y, basis):
+            update += y_i * v
+        x += precondition(update)
+        r = b - A(x)
+        residuals[-1] = _backend.norm(r) / b_norm
+    return SolverResult(x, residuals[-1] <= tol, iteration, residuals)
+
+
+class PythonBackend:
+    """Pure-Python kernels working directly on the flat array('d') buffers.
+    This is the default backend.
+    """
+    name = 'python'
+
+    def elementwise(self, op, operand1: Vector | float, operand2: Vector | float) -> Vector:
+        """Applies a binary operator to two operands of the same shape, either
+        of which may be a scalar.
+        """
+        if isinstance(operand1, Vector):
+            shape = operand1.shape
+            first = operand1._values()
+            second = operand2._values() if isinstance(operand2, Vector) else repeat(operand2)
+        else:
+            shape = operand2.shape
+            first, second = repeat(operand1), operand2._values()
+        return Vector._from_trusted(array('d', map(op, first, second)), shape)
+
+
+    def ielementwise(self, op, target: Vector, operand: Vector | float) -> None:
+        """Applies a binary operator in place on target."""
+        values = operand._values() if isinstance(operand, Vector) else repeat(operand)
+        target._write(map(op, target._values(), values))
+
+
+    def evaluate(self, expression: Expression, out: Vector | None = None) -> Vector:
+        return _result(expression._stream(), expression.shape, out)
+
+
+    def expression_norm(self, expression: Expression) -> float:
+        return sum(a * a for a in expression._stream())**0.5
+
+
+    def norm(self, vector: Vector) -> float:
+        return sum(a * a for a in vector._values())**0.5
+
+
+    def dot_1d(self, vector1: Vector, vector2: Vector) -> float:
+        return sum(a * b for a, b in zip(vector1._values(), vector2._values()))
+
+
+    def matmul_2d(self, vector1: Vector, vector2: Vector, out: Vector | None = None, workers: int | None = None) -> Vector:
+        (m, k), n = vector1.shape, vector2.shape[1]
+        a = vector1._values()
+        # Pack the right operand once: each row of its transpose is one column
+        packed = vector2.T._values()
+
+        if workers is None:
+            workers = (os.cpu_count() or 1) if m * k * n >= _parallel_threshold else 1
+        workers = min(workers, m)
+        if workers > 1:
+            return _result(_parallel_matmul(a, packed, m, k, n, workers), (m, n), out)
+
+        rows = [a[i * k:(i + 1) * k] for i in range(m)]
+        columns = [packed[j * k:(j + 1) * k] for j in range(n)]
+        return _result(_matmul_panels(rows, columns), (m, n), out)
+
+
+    def matvec(self, matrix: Vector, vector: Vector, out: Vector | None = None) -> Vector:
+        m, k = matrix.shape
+        a, x = matrix._values(), vector._values()
+        return _result([sum(map(mul, a[i * k:(i + 1) * k], x)) for i in range(m)], (m,), out)
+
+
+    def vecmat(self, vector: Vector, matrix: Vector, out: Vector | None = None) -> Vector:
+        k, n = matrix.shape
+        x, packed = vector._values(), matrix.T._values()
+        return _result([sum(map(mul, x, packed[j * k:(j + 1) * k])) for j in range(n)], (n,), out)
+
+
+    def cross(self, vector1: Vector, vector2: Vector) -> Vector:
+        (a1, a2, a3), (b1, b2, b3) = vector1._values(), vector2._values()
+        return Vector._from_trusted(array('d', [a2 * b3 - a3 * b2,
+                                                a3 * b1 - a1 * b3,
+                                                a1 * b2 - a2 * b1]), (3,))
+
+
+    def transpose(self, vector: Vector) -> Vector:
+        return vector.T
+
+
+    def sparse_matmul(self, matrix: SparseMatrix, dense: Vector, out: Vector | None = None) -> Vector:
+        m = matrix.shape[0]
+        indptr, indices, values = matrix.indptr, matrix.indices, matrix.values
+        if dense.dimension == 1:
+            x = dense._values()
+            return _result([sum(map(mul, values[indptr[i]:indptr[i + 1]],
+                                    map(x.__getitem__, indices[indptr[i]:indptr[i + 1]])))
+                            for i in range(m)], (m,), out)
+
+        n, p = dense.shape
+        b = dense._values()
+        rows = [b[k * p:(k + 1) * p] for k in range(n)]
+        result = []
+        for i in range(m):
+            row = [0.0] * p
+            for k in range(indptr[i], indptr[i + 1]):
+                row = list(map(add, row, map(mul, repeat(values[k]), rows[indices[k]])))
+            result.extend(row)
+        return _result(result, (m, p), out)
+
+
+    def lu_packed(self, vector: Vector, overwrite: bool = False) -> tuple[Vector, list[int]]:
+        n = vector.shape[0]
+        values = vector._values()
+        rows = [values[i * n:(i + 1) * n] for i in range(n)]
+        pivots = []
+
+        for k in range(n):
+            pivot_index = max(range(k, n), key=lambda i: abs(rows[i][k]))
+            pivots.append(pivot_index)
+            if pivot_index != k:
+                rows[k], rows[pivot_index] = rows[pivot_index], rows[k]
+
+            pivot = rows[k][k]
+            if pivot == 0:
+                continue
+            tail = rows[k][k+1:]
+            for row in rows[k+1:]:
+                factor = row[k] / pivot
+                row[k] = factor
+                if factor:
+                    row[k+1:] = map(sub, row[k+1:], [factor * u for u in tail])
+
+        packed = [a for row in rows for a in row]
+        if overwrite:
+            vector._write(packed)
+            return vector, pivots
+        return Vector._from_trusted(array('d', packed), (n, n)), pivots
+
+
+    def det(self, vector: Vector) -> float:
+        return lu_factor(vector).det()
+
+
+    def lu_solve(self, factor: LUFactor, B: Vector) -> Vector:
+        n, m = B.shape
+        if factor._rows is None:
+            packed = factor.LU._values()
+            factor._rows = [packed[i * n:(i + 1) * n] for i in range(n)]
+        rows, values = factor._rows, B._values()
+
+        if 2 * m < n:
+            # Few right-hand sides: each step is one dot product down a column
+            columns = B.T._values()
+            X = []
+            for k in range(m):
+                b, x = columns[k * n:(k + 1) * n], []
+                for i, row in enumerate(factor._permutation):
+                    x.append(b[row] - sum(map(mul, rows[i][:i], x)))
+                for i in range(n - 1, -1, -1):
+                    if rows[i][i] == 0:
+                        raise ValueError("Matrix is singular.")
+                    x[i] = (x[i] - sum(map(mul, rows[i][i+1:], x[i+1:]))) / rows[i][i]
+                X.append(x)
+            return Vector._from_trusted(array('d', [x for row in zip(*X) for x in row]), (n, m))
+
+        # Eliminate whole rows of the right-hand side block at a time
+        X = [values[row * m:(row + 1) * m] for row in factor._permutation]
+        for i in range(1, n):
+            target = X[i]
+            for j, factor_ij in enumerate(rows[i][:i]):
+                if factor_ij:
+                    target[:] = map(sub, target, map(mul, repeat(factor_ij), X[j]))
+        for i in range(n - 1, -1, -1):
+            target, pivot = X[i], rows[i][i]
+            if pivot == 0:
+                raise ValueError("Matrix is singular.")
+            for j in range(i + 1, n):
+                if rows[i][j]:
+                    target[:] = map(sub, target, map(mul, repeat(rows[i][j]), X[j]))
+            target[:] = map(truediv, target, repeat(pivot))
+        return Vector._from_trusted(array('d', [x for row in X for x in row]), (n, m))
+
+
+    def inv(self, vector: Vector, out: Vector | None = None) -> Vector:
+        n = vector.shape[0]
+        if out is not None:
+            _check_out(out, (n, n))
+        return lu_factor(vector).inv(out)
+
+
+class NumpyBackend(PythonBackend):
+    """Vectorized kernels backed by NumPy.
+    Operands are wrapped as ndarrays without copying through the buffer
+    protocol, and results store their components in a flat float64 ndarray.
+    Requires numpy to be installed.
+    """
+    name = 'numpy'
+
+    def __init__(self) -> None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The numpy backend requires numpy to be installed.") from None
+        self.np = numpy
+        self._ufuncs = {add: numpy.add, sub: numpy.subtract, mul: numpy.multiply, truediv: numpy.true_divide}
+
+
+    def _array(self, vector: Vector) -> 'numpy.ndarray':
+        """Returns an ndarray view of the vector's buffer."""
+        itemsize = vector._data.itemsize
+        return self.np.ndarray(vector.shape, dtype=self.np.float64, buffer=vector._data,
+                               offset=vector._offset * itemsize,
+                               strides=tuple(stride * itemsize for stride in vector._strides))
+
+
+    def _wrap(self, result: 'numpy.ndarray', out: Vector | None = None) -> Vector:
+        """Wraps an ndarray result as a Vector backed by a contiguous ndarray,
+        or copies it into out when one is given.
+        """
+        if out is not None:
+            _check_out(out, result.shape)
+            self._array(out)[...] = result
+            return out
+        result = self.np.ascontiguousarray(result, dtype=self.np.float64)
+        return Vector._from_trusted(result.reshape(-1), result.shape)
+
+
+    def _operand(self, operand: Vector | float) -> 'numpy.ndarray | float':
+        return self._array(operand) if isinstance(operand, Vector) else operand
+
+
+    def _check_divisor(self, op, divisor: 'numpy.ndarray | float') -> None:
+        """Raises ZeroDivisionError for a division by zero, as the python
+        backend does, where NumPy would return inf or nan with a warning.
+        """
+        if op is truediv and self.np.any(self.np.equal(divisor, 0)):
+            raise ZeroDivisionError("float division by zero")
+
+
+    def elementwise(self, op, operand1: Vector | float, operand2: Vector | float) -> Vector:
+        divisor = self._operand(operand2)
+        self._check_divisor(op, divisor)
+        return self._wrap(op(self._operand(operand1), divisor))
+
+
+    def ielementwise(self, op, target: Vector, operand: Vector | float) -> None:
+        ufunc = self._ufuncs.get(op)
+        if ufunc is None:
+            return super().ielementwise(op, target, operand)
+        target_array, operand = self._array(target), self._operand(operand)
+        self._check_divisor(op, operand)
+        ufunc(target_array, operand, out=target_array)
+
+
+    def _evaluate_array(self, node: Expression | Vector | float) -> 'numpy.ndarray | float':
+        if not isinstance(node, Expression):
+            return self._operand(node)
+        operands = [self._evaluate_array(operand) for operand in node.operands]
+        if len(operands) == 2:
+            self._check_divisor(node.op, operands[1])
+        return node.op(*operands)
+
+
+    def evaluate(self, expression: Expression, out: Vector | None = None) -> Vector:
+        return self._wrap(self.np.broadcast_to(self._evaluate_array(expression), expression.shape), out)
+
+
+    def expression_norm(self, expression: Expression) -> float:
+        return float(self.np.linalg.norm(self._evaluate_array(expression)))
+
+
+    def norm(self, vector: Vector) -> float:
+        return float(self.np.linalg.norm(self._array(vector)))
+
+
+    def dot_1d(self, vector1: Vector, vector2: Vector) -> float:
+        return float(self._array(vector1) @ self._array(vector2))
+
+
+    def matmul_2d(self, vector1: Vector, vector2: Vector, out: Vector | None = None, workers: int | None = None) -> Vector:
+        # NumPy's matmul already runs on the BLAS thread pool, so workers is ignored
+        a, b = self._array(vector1), self._array(vector2)
+        if out is not None:
+            _check_out(out, a.shape[:-1] + b.shape[1:])
+            self.np.matmul(a, b, out=self._array(out))
+            return out
+        return self._wrap(a @ b)
+
+
+    matvec = matmul_2d
+    vecmat = matmul_2d
+
+
+    def sparse_matmul(self, matrix: SparseMatrix, dense: Vector, out: Vector | None = None) -> Vector:
+        np = self.np
+        m = matrix.shape[0]
+        indptr = np.frombuffer(matrix.indptr, dtype=np.int64)
+        indices = np.frombuffer(matrix.indices, dtype=np.int64)
+        values = np.frombuffer(matrix.values, dtype=np.float64)
+        rows = np.repeat(np.arange(m), np.diff(indptr))
+        b = self._array(dense)
+        if b.ndim == 1:
+            return self._wrap(np.bincount(rows, weights=values * b[indices], minlength=m), out)
+        result = np.zeros((m, b.shape[1]))
+        np.add.at(result, rows, values[:, None] * b[indices])
+        return self._wrap(result, out)
+
+
+    def lu_packed(self, vector: Vector, overwrite: bool = False) -> tuple[Vector, list[int]]:
+        np = self.np
+        LU = self._array(vector) if overwrite else np.array(self._array(vector))
+        n = LU.shape[0]
+        pivots = []
+
+        for k in range(n):
+            pivot_index = k + int(np.argmax(np.abs(LU[k:, k])))
+            pivots.append(pivot_index)
+            if pivot_index != k:
+                LU[[k, pivot_index]] = LU[[pivot_index, k]]
+            if LU[k, k] != 0:
+                LU[k+1:, k] /= LU[k, k]
+                LU[k+1:, k+1:] -= np.outer(LU[k+1:, k], LU[k, k+1:])
+
+        return (vector if overwrite else self._wrap(LU)), pivots
+
+
+    def lu_solve(self, factor: LUFactor, B: Vector) -> Vector:
+        LU = self._array(factor.LU)
+        X = self._array(B)[factor._permutation]
+        n = LU.shape[0]
+        for i in range(1, n):
+            X[i] -= LU[i, :i] @ X[:i]
+        for i in range(n - 1, -1, -1):
+            if LU[i, i] == 0:
+                raise ValueError("Matrix is singular.")
+            X[i] -= LU[i, i+1:] @ X[i+1:]
+            X[i] /= LU[i, i]
+        return self._wrap(X)
+
+
+    def det(self, vector: Vector) -> float:
+        det_A = float(self.np.linalg.det(self._array(vector)))
+        return det_A if abs(det_A) > 1e-12 else 0.0
+
+
+    def inv(self, vector: Vector, out: Vector | None = None) -> Vector:
+        try:
+            return self._wrap(self.np.linalg.inv(self._array(vector)), out)
+        except self.np.linalg.LinAlgError:
+            raise ValueError("Matrix is singular.") from None
+
+
+_BACKENDS = {'python': PythonBackend, 'numpy': NumpyBackend}
+
+
+def set_backend(name: str) -> None:
+    """Selects the backend used by all vector operations.
+    name - 'python' (the default) or 'numpy'.
+    The VECTOR_BACKEND environment variable sets the backend at import time.
+    """
+    global _backend
+    if name not in _BACKENDS:
+        raise ValueError("Unknown backend '{}'. Choose from: {}.".format(name, ", ".join(_BACKENDS)))
+    _backend = _BACKENDS[name]()
+
+
+def get_backend() -> str:
+    """Returns the name of the active backend."""
+    return _backend.name
+
+
+set_backend(os.environ.get('VECTOR_BACKEND', 'python'))
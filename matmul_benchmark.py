@@ -0,0 +1,66 @@
+"""Size sweep for the matrix multiplication kernels in Vector.py.
+
+Times vec.matmul on random n x n matrices from 4 x 4 up to 512 x 512 and
+reports the time per call and the multiply-add throughput. The naive
+column runs the element-by-element kernel Vector.py used before the
+packed, blocked kernel (skipped above 128 x 128, where it takes minutes).
+The numpy column is filled in when numpy is installed.
+
+Usage:
+    python matmul_benchmark.py
+"""
+import random
+import time
+
+from Vector import Vector
+import Vector as vec
+
+
+SIZES = [4, 8, 16, 32, 64, 128, 256, 512]
+NAIVE_LIMIT = 128
+
+
+def naive_matmul(vector1: Vector, vector2: Vector) -> list:
+    (m, k), n = vector1.shape, vector2.shape[1]
+    a, b = vector1._values(), vector2._values()
+    return [sum(a[i * k + p] * b[p * n + j] for p in range(k)) for i in range(m) for j in range(n)]
+
+
+def time_call(func, *args, min_time: float = 0.2) -> float:
+    """Returns the mean seconds per call, repeating until min_time has passed."""
+    calls, start = 0, time.perf_counter()
+    while True:
+        func(*args)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def random_matrix(n: int) -> Vector:
+    return Vector([[random.random() for _ in range(n)] for _ in range(n)])
+
+
+def main() -> None:
+    try:
+        vec.set_backend('numpy')
+        has_numpy = True
+    except ImportError:
+        has_numpy = False
+    vec.set_backend('python')
+
+    print("{:>5} {:>14} {:>10} {:>14} {:>14}".format("n", "matmul (s)", "Mmac/s", "naive (s)", "numpy (s)"))
+    for n in SIZES:
+        A, B = random_matrix(n), random_matrix(n)
+        seconds = time_call(vec.matmul, A, B)
+        naive = "{:14.6f}".format(time_call(naive_matmul, A, B)) if n <= NAIVE_LIMIT else "{:>14}".format("-")
+        numpy_time = "{:>14}".format("-")
+        if has_numpy:
+            vec.set_backend('numpy')
+            numpy_time = "{:14.6f}".format(time_call(vec.matmul, A, B))
+            vec.set_backend('python')
+        print("{:5d} {:14.6f} {:10.1f} {} {}".format(n, seconds, n ** 3 / seconds / 1e6, naive, numpy_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,488 @@
+"""Runge-Kutta integrators for systems of ODEs y' = f(t, y).
+The state y can be a scalar, a NumPy array of any shape or a Vector; f receives
+the state in the same form and returns its derivative.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from Vector import Vector
+
+
+ODEResult = namedtuple('ODEResult', ['t', 'y', 'steps', 'rejected', 'evaluations'])
+
+# Dormand-Prince 5(4) tableau. _DP_E is the difference between the 5th and 4th
+# order weights, and _DP_P the 4th-order continuous extension used for dense
+# output (Hairer, Norsett & Wanner).
+_DP_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+_DP_A = [np.array(row) for row in ([],
+                                   [1/5],
+                                   [3/40, 9/40],
+                                   [44/45, -56/15, 32/9],
+                                   [19372/6561, -25360/2187, 64448/6561, -212/729],
+                                   [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656])]
+_DP_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+_DP_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+_DP_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+
+_worker_f = None
+_worker_inplace = False
+
 
 def dydt(t, y):
     return -2 * y
 
-def runge_kutta_4(f, y0, t0, tf, h):
-    t_values = np.arange(t0, tf + h, h)
-    y_values = np.zeros(len(t_values))
-    y_values[0] = y0
 
-    for i in range(1, len(t_values)):
-        t = t_values[i-1]
-        y = y_values[i-1]
+def _state(y0):
+    """Returns the initial state as a float array, a function presenting an
+    array buffer to f in the caller's form (a Vector sharing the buffer for
+    Vector states) and a function reading f's result back as an array.
+    """
+    if isinstance(y0, Vector):
+        shape = y0.shape
+        return (np.array(y0._values(), dtype=float).reshape(shape),
+                lambda buffer: Vector._from_trusted(buffer.reshape(-1), shape),
+                lambda result: np.asarray(result._values()).reshape(shape))
+    return np.array(y0, dtype=float), lambda buffer: buffer, np.asarray
+
+
+def _derivative(f, present, read, inplace: bool):
+    """Returns a function evaluating f(t, state) into a preallocated stage buffer.
+    The state and stage buffers are presented to f once and the views reused.
+    The buffers are rewritten by NumPy behind the views' backs, so Vector views
+    are touched before every call to drop results cached from old contents.
+    """
+    views = {}
+
+    def view(buffer):
+        if id(buffer) not in views:
+            views[id(buffer)] = (buffer, present(buffer))
+        wrapper = views[id(buffer)][1]
+        if isinstance(wrapper, Vector):
+            wrapper._touch()
+        return wrapper
+
+    if inplace:
+        def evaluate(t, state, k):
+            f(t, view(state), view(k))
+    else:
+        def evaluate(t, state, k):
+            k[...] = read(f(t, view(state)))
+    return evaluate
+
+
+def _step_count(t0: float, tf: float, h: float) -> int:
+    return int(np.ceil((tf - t0) / h - 1e-9))
+
+
+def _time_grid(t0: float, tf: float, h: float):
+    """Returns t0, t0 + h, ... with the last time moved onto tf, so a final
+    step shorter than h ends exactly there.
+    """
+    t_values = t0 + h * np.arange(_step_count(t0, tf, h) + 1)
+    if len(t_values) > 1:
+        t_values[-1] = tf
+    return t_values
+
 
-        k1 = f(t, y)
-        k2 = f(t + h/2, y + h*k1/2)
-        k3 = f(t + h/2, y + h*k2/2)
-        k4 = f(t + h, y + h*k3)
+def _rk4_stepper(derivative, y, h: float):
+    """Returns a function advancing the state array y in place by one RK4 step
+    of size h, or of the given size, from a given time. The stage buffers are
+    allocated once and reused.
+    """
+    buffers = tuple(np.empty_like(y) for _ in range(5))
 
-        y_values[i] = y + h*(k1 + 2*k2 + 2*k3 + k4)/6
+    def step(t: float, h: float = h) -> None:
+        state, (stage, k1, k2, k3, k4) = y, buffers
+        derivative(t, state, k1)
+        np.multiply(k1, h / 2, out=stage)
+        stage += state
+        derivative(t + h / 2, stage, k2)
+        np.multiply(k2, h / 2, out=stage)
+        stage += state
+        derivative(t + h / 2, stage, k3)
+        np.multiply(k3, h, out=stage)
+        stage += state
+        derivative(t + h, stage, k4)
 
+        # y += h (k1 + 2 k2 + 2 k3 + k4) / 6
+        k2 += k3
+        k2 *= 2
+        k1 += k2
+        k1 += k4
+        k1 *= h / 6
+        state += k1
+    return step
+
+
+def _rk4(derivative, y, t_values, h: float, y_values) -> None:
+    """Advances the state array y over t_values with RK4, writing the state
+    at each time into y_values.
+    """
+    y_values[0] = y
+    step = _rk4_stepper(derivative, y, h)
+    last = len(t_values) - 1
+    for i in range(1, last + 1):
+        t = t_values[i - 1]
+        step(t, t_values[i] - t if i == last else h)
+        y_values[i] = y
+
+
+def runge_kutta_4(f, y0, t0: float, tf: float, h: float, inplace: bool = False):
+    """Integrates y' = f(t, y) from t0 to tf with the classical fourth-order
+    Runge-Kutta method and a fixed step h.
+    f - Right-hand side f(t, y) returning the derivative in y's shape. With
+        inplace=True it is called as f(t, y, out) and writes the derivative
+        into out instead, so that steps allocate nothing.
+    y0 - Initial state: a scalar, an array or a Vector.
+    Returns the times and an array holding the state at each time. When h
+    does not divide tf - t0 the last step is shortened to end exactly at tf.
+    The stage buffers k1-k4 are allocated once and updated in place, so the
+    Python overhead per step does not grow with the size of the state.
+    """
+    y, present, read = _state(y0)
+    t_values = _time_grid(t0, tf, h)
+    y_values = np.empty((len(t_values),) + y.shape)
+    _rk4(_derivative(f, present, read, inplace), y, t_values, h, y_values)
+    return t_values, y_values
+
+
+def iter_runge_kutta_4(f, y0, t0: float, tf: float, h: float, chunk_size: int = 1024,
+                       inplace: bool = False, sink: str | None = None):
+    """Integrates like runge_kutta_4 but yields the trajectory in chunks as it
+    is computed, so only one chunk of states is held in memory at a time.
+    chunk_size - Number of times per chunk.
+    sink - Optional path of a .npy file receiving the trajectory. It is
+           memory-mapped with shape (len(t),) + state shape, and each chunk is
+           computed directly into it and flushed before being yielded, so
+           trajectories larger than memory can be written and read back with
+           np.load(sink, mmap_mode='r'). The file holds the states only; the
+           times are t0 + i h as in runge_kutta_4.
+    f, y0, h, inplace - As for runge_kutta_4.
+    Yields (t_values, y_values) chunks that together make up the result of
+    runge_kutta_4. With a sink, y_values are views of the mapped file.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive.")
+    y, present, read = _state(y0)
+    steps = _step_count(t0, tf, h)
+    step = _rk4_stepper(_derivative(f, present, read, inplace), y, h)
+    stored = None
+    if sink is not None:
+        stored = np.lib.format.open_memmap(sink, mode='w+', dtype=float, shape=(steps + 1,) + y.shape)
+
+    for start in range(0, steps + 1, chunk_size):
+        stop = min(start + chunk_size, steps + 1)
+        t_values = t0 + h * np.arange(start, stop)
+        if stop == steps + 1 and steps:
+            t_values[-1] = tf
+        y_values = np.empty((stop - start,) + y.shape) if stored is None else stored[start:stop]
+        for i in range(start, stop):
+            if i:
+                t = t0 + h * (i - 1)
+                step(t, tf - t if i == steps else h)
+            y_values[i - start] = y
+        if stored is not None:
+            stored.flush()
+        yield t_values, y_values
+
+
+def _ensemble_states(y0s):
+    """Returns the stacked initial states of an ensemble as a float array."""
+    y0s = np.array(y0s, dtype=float)
+    if y0s.ndim == 0:
+        raise ValueError("y0s must stack the initial states along its first axis.")
+    if len(y0s) == 0:
+        raise ValueError("The ensemble is empty: y0s has no initial states.")
+    return y0s
+
+
+def runge_kutta_4_ensemble(f, y0s, t0: float, tf: float, h: float, chunk_size: int | None = None,
+                           inplace: bool = False):
+    """Integrates y' = f(t, y) with RK4 for many initial conditions at once.
+    The states are stacked along a leading batch axis and advanced together,
+    so f is evaluated once per stage for the whole batch rather than once per
+    trajectory, and must accept and return a stack of states.
+    y0s - Initial states stacked along the first axis, shape (N,) + state shape.
+    chunk_size - Number of trajectories advanced together, which bounds the
+                 batch passed to f and the stage buffers (five chunks of
+                 states). By default the whole batch is one chunk.
+    f, h, inplace - As for runge_kutta_4.
+    Returns the times and an array of shape (len(t), N) + state shape holding
+    the ensemble at each time. This array is allocated in full up front, so
+    chunk_size does not bound the peak memory of the result itself.
+    """
+    y0s = _ensemble_states(y0s)
+    count = len(y0s)
+    chunk_size = count if chunk_size is None else chunk_size
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive.")
+
+    t_values = _time_grid(t0, tf, h)
+    y_values = np.empty((len(t_values),) + y0s.shape)
+    for start in range(0, count, chunk_size):
+        y, present, read = _state(y0s[start:start + chunk_size])
+        _rk4(_derivative(f, present, read, inplace), y, t_values, h, y_values[:, start:start + chunk_size])
     return t_values, y_values
 
-# Parameters
-y0 = 1
-t0 = 0
-tf = 2
-h = 0.1
-
-# Solve the ODE using RK4
-t_values, y_values_rk4 = runge_kutta_4(dydt, y0, t0, tf, h)
-
-# Exact solution
-y_exact = np.exp(-2 * t_values)
-
-# Plot the results
-plt.plot(t_values, y_values_rk4, 'b-', label='RK4 Approximation')
-plt.plot(t_values, y_exact, 'r--', label='Exact Solution')
-plt.xlabel('t')
-plt.ylabel('y')
-plt.legend()
-plt.title('Runge-Kutta 4th Order Method vs Exact Solution')
-plt.show()
-
-# Calculate and print the error
-error = np.abs(y_exact - y_values_rk4)
-print("Maximum error:", np.max(error))
+
+def _bind(f, params):
+    """Returns f with the parameters appended to its arguments, or f itself."""
+    if params is None:
+        return f
+    return lambda t, y, *out: f(t, y, *out, params)
+
+
+def _init_worker(f, inplace: bool, sample) -> None:
+    """Process pool initializer for iter_ensemble. Keeps f in the worker, so it
+    is sent once per worker rather than with every chunk, and evaluates it
+    once on a sample (t, y0s, params) so one-off costs such as imports or JIT
+    compilation are paid before the first chunk.
+    """
+    global _worker_f, _worker_inplace
+    _worker_f, _worker_inplace = f, inplace
+    if sample is not None:
+        t, y0s, params = sample
+        y, present, read = _state(y0s)
+        _derivative(_bind(f, params), present, read, inplace)(t, y, np.empty_like(y))
+
+
+def _ensemble_task(y0s, params, t0: float, tf: float, h: float):
+    """Worker task for iter_ensemble: integrates one chunk of the ensemble."""
+    return runge_kutta_4_ensemble(_bind(_worker_f, params), y0s, t0, tf, h, inplace=_worker_inplace)[1]
+
+
+def iter_ensemble(f, y0s, t0: float, tf: float, h: float, params=None, workers: int | None = None,
+                  chunk_size: int | None = None, warm_up: bool = True, inplace: bool = False):
+    """Integrates an ensemble with RK4 on a process pool, yielding each chunk
+    of trajectories as soon as a worker finishes it.
+    Each worker advances its chunk with runge_kutta_4_ensemble, so f is
+    vectorized over the chunk as there, and must be picklable.
+    params - Optional per-trajectory parameters, one row per initial
+             condition. The rows of a chunk are passed to f as a last
+             argument, f(t, y, params) or f(t, y, out, params).
+    workers - Number of processes, one per CPU by default.
+    chunk_size - Trajectories per task. By default each worker gets about
+                 four chunks, which balances the load.
+    warm_up - Evaluate f once in every worker before any chunk is integrated.
+    f, y0s, h, inplace - As for runge_kutta_4_ensemble.
+    Yields (start, y_values) pairs in completion order, where y_values holds
+    trajectories start to start + y_values.shape[1] as in
+    runge_kutta_4_ensemble. The arguments are checked when iter_ensemble is
+    called, before any chunk is requested.
+    """
+    y0s = _ensemble_states(y0s)
+    count = len(y0s)
+    if params is not None:
+        params = np.asarray(params)
+        if params.ndim == 0 or len(params) != count:
+            raise ValueError("params must have one row per initial condition.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be positive.")
+    if chunk_size is None:
+        chunk_size = max(1, -(-count // (4 * workers)))
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive.")
+    return _iter_ensemble(f, y0s, t0, tf, h, params, workers, chunk_size, warm_up, inplace)
+
+
+def _iter_ensemble(f, y0s, t0: float, tf: float, h: float, params, workers: int, chunk_size: int,
+                   warm_up: bool, inplace: bool):
+    """Generator behind iter_ensemble, taking arguments it has checked."""
+    count = len(y0s)
+    sample = (t0, y0s[:1], None if params is None else params[:1]) if warm_up else None
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(f, inplace, sample))
+    try:
+        futures = {pool.submit(_ensemble_task, y0s[start:start + chunk_size],
+                               None if params is None else params[start:start + chunk_size],
+                               t0, tf, h): start
+                   for start in range(0, count, chunk_size)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def parallel_ensemble(f, y0s, t0: float, tf: float, h: float, params=None, workers: int | None = None,
+                      chunk_size: int | None = None, warm_up: bool = True, inplace: bool = False):
+    """Integrates an ensemble with RK4 on a process pool and reassembles it in
+    the order of y0s. Every chunk is integrated independently, so the result
+    does not depend on the order in which workers finish.
+    Arguments are as for iter_ensemble.
+    Returns the times and the ensemble as for runge_kutta_4_ensemble.
+    """
+    y0s = _ensemble_states(y0s)
+    chunks = iter_ensemble(f, y0s, t0, tf, h, params, workers, chunk_size, warm_up, inplace)
+    t_values = _time_grid(t0, tf, h)
+    y_values = np.empty((len(t_values),) + y0s.shape)
+    for start, chunk in chunks:
+        y_values[:, start:start + chunk.shape[1]] = chunk
+    return t_values, y_values
+
+
+def _rms(values) -> float:
+    return float(np.sqrt(np.mean(np.square(values))))
+
+
+def _initial_step(derivative, t0: float, y, k0, stage, k1, rtol: float, atol: float) -> float:
+    """Estimates a first step size from the size of y and of its first two
+    derivatives, as in Hairer, Norsett & Wanner. Uses one evaluation of f.
+    """
+    scale = atol + np.abs(y) * rtol
+    d0, d1 = _rms(y / scale), _rms(k0 / scale)
+    h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+    np.multiply(k0, h0, out=stage)
+    stage += y
+    derivative(t0 + h0, stage, k1)
+    d2 = _rms((k1 - k0) / scale) / h0
+    h1 = max(1e-6, h0 * 1e-3) if max(d1, d2) <= 1e-15 else (0.01 / max(d1, d2)) ** (1 / 5)
+    return min(100 * h0, h1)
+
+
+def runge_kutta_45(f, y0, t0: float, tf: float, rtol: float = 1e-6, atol: float = 1e-9,
+                   t_eval=None, h0: float | None = None, max_step: float = np.inf,
+                   inplace: bool = False) -> ODEResult:
+    """Integrates y' = f(t, y) from t0 to tf with the adaptive Dormand-Prince
+    5(4) method. Each step is accepted when the embedded error estimate is
+    within atol + rtol |y| in the root-mean-square sense, and the next step
+    size follows from the estimate. The last stage of a step is the first
+    of the next (FSAL), so an accepted step costs six evaluations of f.
+    f, y0, inplace - As for runge_kutta_4.
+    tf - End time, greater than t0.
+    rtol, atol - Relative and absolute error tolerances.
+    t_eval - Sorted times in [t0, tf] at which to report the solution. They are
+                interpolated from the steps taken (dense output), so they
+                never shorten a step. By default every step is reported.
+    h0 - First step size, estimated from f when not given.
+    max_step - Largest step size allowed.
+    Returns an ODEResult with the times, the states, the number of accepted
+    and rejected steps and the number of evaluations of f.
+    """
+    y, present, read = _state(y0)
+    if tf <= t0:
+        raise ValueError("tf must be greater than t0.")
+    shape = y.shape
+    derivative = _derivative(f, present, read, inplace)
+    K = np.empty((7, y.size))
+    ks = [K[i].reshape(shape) for i in range(7)]
+    stage, y_new = np.empty_like(y), np.empty_like(y)
+    y_flat, stage_flat, y_new_flat = y.reshape(-1), stage.reshape(-1), y_new.reshape(-1)
+    error = np.empty(y.size)
+
+    t = t0
+    derivative(t, y, ks[0])
+    evaluations = 1
+    if h0 is None:
+        h0 = _initial_step(derivative, t0, y, ks[0], stage, ks[1], rtol, atol)
+        evaluations += 1
+    h = min(h0, max_step)
+
+    if t_eval is None:
+        t_values, y_values = [t0], [y.copy()]
+    else:
+        t_eval = np.asarray(t_eval, dtype=float)
+        if t_eval.ndim != 1 or len(t_eval) == 0:
+            raise ValueError("t_eval must be a non-empty sequence of times.")
+        if np.any(np.diff(t_eval) < 0) or t_eval[0] < t0 or t_eval[-1] > tf:
+            raise ValueError("t_eval must be sorted and lie within [t0, tf].")
+        y_values = np.empty((len(t_eval),) + shape)
+        filled = int(np.searchsorted(t_eval, t0, side='right'))
+        y_values[:filled] = y
+
+    steps = rejected = 0
+    step_rejected = False
+    while t < tf:
+        last = h >= tf - t
+        if last:
+            h = tf - t
+        if h < 10 * np.spacing(t):
+            raise RuntimeError("Step size became too small at t = {}.".format(t))
+
+        for i in range(1, 6):
+            np.dot(h * _DP_A[i], K[:i], out=stage_flat)
+            stage_flat += y_flat
+            derivative(t + _DP_C[i] * h, stage, ks[i])
+        np.dot(h * _DP_B, K[:6], out=y_new_flat)
+        y_new_flat += y_flat
+        derivative(t + h, y_new, ks[6])
+        evaluations += 6
+
+        np.dot(h * _DP_E, K, out=error)
+        error /= atol + np.maximum(np.abs(y_flat), np.abs(y_new_flat)) * rtol
+        error_norm = _rms(error)
+        if error_norm >= 1:
+            h *= max(0.2, 0.9 * error_norm ** -0.2)
+            rejected += 1
+            step_rejected = True
+            continue
+
+        t_new = tf if last else t + h
+        if t_eval is None:
+            t_values.append(t_new)
+            y_values.append(y_new.copy())
+        else:
+            stop = int(np.searchsorted(t_eval, t_new, side='right'))
+            if stop > filled:
+                # y(t + x h) = y + h K^T P [x, x^2, x^3, x^4]
+                x = (t_eval[filled:stop] - t) / h
+                powers = np.cumprod(np.repeat(x[:, None], 4, axis=1), axis=1)
+                y_values[filled:stop] = (y_flat + h * powers @ (K.T @ _DP_P).T).reshape((-1,) + shape)
+                filled = stop
+
+        y[...] = y_new
+        K[0] = K[6]
+        t = t_new
+        steps += 1
+        factor = 10.0 if error_norm == 0 else min(10.0, 0.9 * error_norm ** -0.2)
+        h *= min(1.0, factor) if step_rejected else factor
+        h = min(h, max_step)
+        step_rejected = False
+
+    if t_eval is None:
+        return ODEResult(np.array(t_values), np.array(y_values), steps, rejected, evaluations)
+    return ODEResult(t_eval, y_values, steps, rejected, evaluations)
+
+
+def main():
+    import matplotlib.pyplot as plt
+
+    # Parameters
+    y0 = 1
+    t0 = 0
+    tf = 2
+    h = 0.1
+
+    # Solve the ODE using RK4
+    t_values, y_values_rk4 = runge_kutta_4(dydt, y0, t0, tf, h)
+
+    # Exact solution
+    y_exact = np.exp(-2 * t_values)
+
+    # Plot the results
+    plt.plot(t_values, y_values_rk4, 'b-', label='RK4 Approximation')
+    plt.plot(t_values, y_exact, 'r--', label='Exact Solution')
+    plt.xlabel('t')
+    plt.ylabel('y')
+    plt.legend()
+    plt.title('Runge-Kutta 4th Order Method vs Exact Solution')
+    plt.show()
+
+    # Calculate and print the error
+    error = np.abs(y_exact - y_values_rk4)
+    print("Maximum error:", np.max(error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import math
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Vector import Vector
+import Vector as vec
+import runge_kutta as rk
+
+
+def test_runge_kutta_4():
+    """Tests fixed-step RK4 on scalar, array and Vector states."""
+    t, y = rk.runge_kutta_4(rk.dydt, 1, 0, 2, 0.1)
+    assert t.shape == y.shape == (21,)
+    assert t[-1] == pytest.approx(2)
+    assert np.max(np.abs(y - np.exp(-2 * t))) < 1e-5
+
+    # A step that does not divide the interval is shortened to end at tf
+    t, y = rk.runge_kutta_4(rk.dydt, 1, 0, 1, 0.3)
+    assert np.allclose(t, [0, 0.3, 0.6, 0.9, 1]) and t[-1] == 1
+    assert y[-1] == pytest.approx(math.exp(-2), abs=1e-3)
+    _, ys = rk.runge_kutta_4_ensemble(rk.dydt, [1, 2], 0, 1, 0.3)
+    assert np.array_equal(ys[:, 1], 2 * y)
+    chunks = list(rk.iter_runge_kutta_4(rk.dydt, 1, 0, 1, 0.3, chunk_size=2))
+    assert np.array_equal(np.concatenate([t_chunk for t_chunk, _ in chunks]), t)
+    assert np.array_equal(np.concatenate([y_chunk for _, y_chunk in chunks]), y)
+
+    # Harmonic oscillator as an array state, with and without an in-place f
+    def oscillator(t, y):
+        return np.array([y[1], -y[0]])
+
+    def oscillator_inplace(t, y, out):
+        out[0], out[1] = y[1], -y[0]
+
+    t, y = rk.runge_kutta_4(oscillator, [1.0, 0.0], 0, math.pi, math.pi / 300)
+    assert y.shape == (len(t), 2)
+    assert y[-1] == pytest.approx([-1, 0], abs=1e-6)
+    _, y_inplace = rk.runge_kutta_4(oscillator_inplace, [1.0, 0.0], 0, math.pi, math.pi / 300, inplace=True)
+    assert np.array_equal(y, y_inplace)
+
+    # The rotation state R' = [omega]x R stays close to the exact rotation
+    omega = Vector([0.3, -0.2, 0.5])
+    Psi = Vector([[0, -0.5, -0.2], [0.5, 0, -0.3], [0.2, 0.3, 0]])
+    t, R = rk.runge_kutta_4(lambda t, R: Psi @ R, vec.eye(3), 0, 1, 0.01)
+    assert R.shape == (len(t), 3, 3)
+    assert Vector(R[-1].tolist()) == vec.so3_exp(omega, 1)
+
+    def rotation_inplace(t, R, out):
+        vec.dot(Psi, R, out=out)
+
+    _, R_inplace = rk.runge_kutta_4(rotation_inplace, vec.eye(3), 0, 1, 0.01, inplace=True)
+    assert np.allclose(R, R_inplace)
+
+
+def test_runge_kutta_45():
+    """Tests adaptive Dormand-Prince steps, dense output and the counters."""
+    result = rk.runge_kutta_45(rk.dydt, 1, 0, 2)
+    assert result.t[0] == 0 and result.t[-1] == 2
+    assert result.y.shape == result.t.shape
+    assert np.max(np.abs(result.y - np.exp(-2 * result.t))) < 1e-6
+    # FSAL: one evaluation for f(t0), one for the initial step estimate and
+    # six for each attempted step
+    assert result.evaluations == 2 + 6 * (result.steps + result.rejected)
+
+    def oscillator(t, y):
+        return np.array([y[1], -y[0]])
+
+    # Dense output fills t_eval without taking more steps
+    t_eval = np.linspace(0, 10, 1001)
+    coarse = rk.runge_kutta_45(oscillator, [1.0, 0.0], 0, 10, rtol=1e-8, atol=1e-10)
+    dense = rk.runge_kutta_45(oscillator, [1.0, 0.0], 0, 10, rtol=1e-8, atol=1e-10, t_eval=t_eval)
+    assert dense.steps == coarse.steps < 200
+    assert dense.y.shape == (1001, 2)
+    assert np.max(np.abs(dense.y[:, 0] - np.cos(t_eval))) < 1e-6
+    assert np.max(np.abs(dense.y[:, 1] + np.sin(t_eval))) < 1e-6
+
+    # Tighter tolerances cost more steps, and max_step bounds the step size
+    loose = rk.runge_kutta_45(oscillator, [1.0, 0.0], 0, 10, rtol=1e-4, atol=1e-6)
+    assert loose.steps < coarse.steps
+    bounded = rk.runge_kutta_45(oscillator, [1.0, 0.0], 0, 10, rtol=1e-4, atol=1e-6, max_step=0.5)
+    assert np.max(np.diff(bounded.t)) <= 0.5 + 1e-12
+
+    # Vector states, with an in-place f
+    omega = Vector([0.3, -0.2, 0.5])
+    Psi = Vector([[0, -0.5, -0.2], [0.5, 0, -0.3], [0.2, 0.3, 0]])
+
+    def rotation_inplace(t, R, out):
+        vec.dot(Psi, R, out=out)
+
+    result = rk.runge_kutta_45(rotation_inplace, vec.eye(3), 0, 1, t_eval=[0.5, 1], inplace=True)
+    assert Vector(result.y[-1].tolist()) == vec.so3_exp(omega, 1)
+    assert Vector(result.y[0].tolist()) == vec.so3_exp(omega, 0.5)
+
+    with pytest.raises(ValueError):
+        rk.runge_kutta_45(rk.dydt, 1, 0, 2, t_eval=[1, 3])
+    with pytest.raises(ValueError):
+        rk.runge_kutta_45(rk.dydt, 1, 0, 2, t_eval=[])
+
+
+def test_runge_kutta_4_ensemble():
+    """Tests that ensembles match trajectories integrated one at a time."""
+    def oscillator(t, y):
+        return np.stack([y[..., 1], -y[..., 0]], axis=-1)
+
+    calls = []
+
+    def counted(t, y):
+        calls.append(len(y))
+        return oscillator(t, y)
+
+    y0s = np.random.default_rng(0).normal(size=(7, 2))
+    t, ys = rk.runge_kutta_4_ensemble(counted, y0s, 0, 1, 0.1)
+    assert ys.shape == (len(t), 7, 2)
+    assert calls == [7] * 4 * (len(t) - 1)
+    for i, y0 in enumerate(y0s):
+        _, y = rk.runge_kutta_4(oscillator, y0, 0, 1, 0.1)
+        assert np.allclose(ys[:, i], y)
+
+    # Chunks bound the batch passed to f without changing the result
+    calls.clear()
+    _, chunked = rk.runge_kutta_4_ensemble(counted, y0s, 0, 1, 0.1, chunk_size=3)
+    assert set(calls) == {3, 1}
+    assert np.array_equal(chunked, ys)
+
+    def oscillator_inplace(t, y, out):
+        out[:, 0], out[:, 1] = y[:, 1], -y[:, 0]
+
+    _, inplace = rk.runge_kutta_4_ensemble(oscillator_inplace, y0s, 0, 1, 0.1, chunk_size=4, inplace=True)
+    assert np.array_equal(inplace, ys)
+
+    # Scalar states stack to a 1D batch
+    t, ys = rk.runge_kutta_4_ensemble(rk.dydt, [1, 2, 3], 0, 2, 0.1)
+    assert np.allclose(ys, np.exp(-2 * t)[:, None] * [1, 2, 3], atol=1e-4)
+
+    with pytest.raises(ValueError, match="empty"):
+        rk.runge_kutta_4_ensemble(rk.dydt, np.empty((0, 2)), 0, 1, 0.1)
+    with pytest.raises(ValueError, match="chunk_size"):
+        rk.runge_kutta_4_ensemble(rk.dydt, y0s, 0, 1, 0.1, chunk_size=0)
+
+
+def damped_oscillator(t, y, damping):
+    return np.stack([y[:, 1], -y[:, 0] - damping * y[:, 1]], axis=-1)
+
+
+def test_parallel_ensemble():
+    """Tests that the process-pool ensemble matches the serial one."""
+    y0s = np.random.default_rng(1).normal(size=(10, 2))
+    t, serial = rk.runge_kutta_4_ensemble(rk.dydt, y0s, 0, 1, 0.1)
+    t_parallel, parallel = rk.parallel_ensemble(rk.dydt, y0s, 0, 1, 0.1, workers=2, chunk_size=3)
+    assert np.array_equal(t_parallel, t)
+    assert np.array_equal(parallel, serial)
+
+    # Chunks stream back covering every trajectory exactly once
+    starts = sorted(start for start, _ in rk.iter_ensemble(rk.dydt, y0s, 0, 1, 0.1, workers=2, chunk_size=4))
+    assert starts == [0, 4, 8]
+
+    # Per-trajectory parameters follow their initial conditions
+    damping = np.linspace(0, 1, 10)
+    _, ys = rk.parallel_ensemble(damped_oscillator, y0s, 0, 1, 0.1, params=damping, workers=2)
+    for i in (0, 9):
+        _, y = rk.runge_kutta_4_ensemble(lambda t, y: damped_oscillator(t, y, damping[i]), y0s[i:i + 1], 0, 1, 0.1)
+        assert np.allclose(ys[:, i], y[:, 0])
+
+    with pytest.raises(ValueError):
+        rk.parallel_ensemble(damped_oscillator, y0s, 0, 1, 0.1, params=damping[:5])
+    # Bad arguments fail when iter_ensemble is called, not on the first next()
+    with pytest.raises(ValueError):
+        rk.iter_ensemble(damped_oscillator, y0s, 0, 1, 0.1, params=damping[:5])
+    with pytest.raises(ValueError):
+        rk.iter_ensemble(rk.dydt, y0s, 0, 1, 0.1, chunk_size=0)
+    with pytest.raises(ValueError):
+        rk.iter_ensemble(rk.dydt, y0s, 0, 1, 0.1, workers=0)
+    with pytest.raises(ValueError):
+        rk.iter_ensemble(rk.dydt, [], 0, 1, 0.1)
+
+
+def test_iter_runge_kutta_4(tmp_path):
+    """Tests that streamed chunks and the memory-mapped sink match runge_kutta_4."""
+    def oscillator(t, y):
+        return np.array([y[1], -y[0]])
+
+    t, y = rk.runge_kutta_4(oscillator, [1.0, 0.0], 0, 10, 0.01)
+    chunks = list(rk.iter_runge_kutta_4(oscillator, [1.0, 0.0], 0, 10, 0.01, chunk_size=300))
+    assert [len(t_chunk) for t_chunk, _ in chunks] == [300, 300, 300, 101]
+    assert np.array_equal(np.concatenate([t_chunk for t_chunk, _ in chunks]), t)
+    assert np.array_equal(np.concatenate([y_chunk for _, y_chunk in chunks]), y)
+
+    # The generator only integrates as far as it is consumed
+    calls = []
+    stream = rk.iter_runge_kutta_4(lambda t, y: calls.append(t) or -y, 1, 0, 10, 0.01, chunk_size=10)
+    next(stream)
+    assert len(calls) == 4 * 9
+
+    path = str(tmp_path / "trajectory.npy")
+    for _ in rk.iter_runge_kutta_4(oscillator, [1.0, 0.0], 0, 10, 0.01, chunk_size=256, sink=path):
+        pass
+    stored = np.load(path, mmap_mode='r')
+    assert stored.shape == y.shape
+    assert np.array_equal(stored, y)
+
+
+def test_vector_state_cache():
+    """Tests that cached results never outlive the state buffers they came from."""
+    def decay(t, y):
+        return y * -vec.norm(y)
+
+    expected = rk.runge_kutta_4(lambda t, y: y * -np.linalg.norm(y), [1.0, 2.0], 0, 1, 0.1)[1]
+    assert np.allclose(rk.runge_kutta_4(decay, Vector([1.0, 2.0]), 0, 1, 0.1)[1], expected)
+    streamed = np.concatenate([y for _, y in rk.iter_runge_kutta_4(decay, Vector([1.0, 2.0]), 0, 1, 0.1, chunk_size=4)])
+    assert np.allclose(streamed, expected)
+
+    result = rk.runge_kutta_45(decay, Vector([1.0, 2.0]), 0, 1, t_eval=[1])
+    exact = rk.runge_kutta_45(lambda t, y: y * -np.linalg.norm(y), [1.0, 2.0], 0, 1, t_eval=[1])
+    assert np.allclose(result.y, exact.y)
+
+    # Matrices above the closed-form sizes go through the cached inverse
+    A = 2 * vec.eye(5)
+
+    def scaled(t, Y):
+        return vec.inv(Y) @ A
+
+    expected = rk.runge_kutta_4(lambda t, Y: np.linalg.inv(Y) @ (2 * np.eye(5)), np.eye(5), 0, 0.5, 0.05)[1]
+    assert np.allclose(rk.runge_kutta_4(scaled, vec.eye(5), 0, 0.5, 0.05)[1], expected)
@@ -7,21 +7,6 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 
 
-# Define the rotation matrix
-def rotation_matrix(axis, theta):
-    """
-    Return the rotation matrix associated with counterclockwise rotation about
-    the given axis by theta radians.
-    """
-    axis = axis / math.sqrt(vec.dot(axis, axis))
-    a = math.cos(theta / 2.0)
-    b, c, d = -axis * math.sin(theta / 2.0)
-    aa, bb, cc, dd = a * a, b * b, c * c, d * d
-    bc, ad, ac, ab, bd, cd = b * c, a * d, a * c, a * b, b * d, c * d
-    return Vector([[aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac)],
-                     [2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab)],
-                     [2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc]])
-
 # Initial vector
 v = Vector([1/math.sqrt(3), 1/math.sqrt(3), 1/math.sqrt(3)])
 
@@ -29,7 +14,7 @@ v = Vector([1/math.sqrt(3), 1/math.sqrt(3), 1/math.sqrt(3)])
 axis = Vector([1/math.sqrt(2), 1/math.sqrt(2), 0])
 theta = 0.1  # Small angle for smooth animation
 omega = axis * theta
-R = rotation_matrix(axis, theta) # Initial rotation matrix
+R = vec.rotation_matrix(axis, theta) # Initial rotation matrix
 
 fig = plt.figure()
 ax = fig.add_subplot(111, projection='3d')
@@ -38,41 +23,10 @@ ax.set_ylim([-1, 1])
 ax.set_zlim([-1, 1])
 
 
-def unitary_step(U):
-    """Returns a step U_{k+1} in the "Newton's method" calculation of a matrix's
-    unitary matrix U in its polar decomposition.
-    Averages the matrix U_k with the inverse of its transpose.
-    A = UP, where U is unitary and P is positive semi-definite Hermitian.
-    U_{k+1} = (1/2) * (U_k + (U_k^{*})^{-1}), k = 0, 1, 2, ...,
-    where
-    U_0 = A.
-    """
-    U_inv_transpose = vec.inv(U).T
-    return 0.5 * (U + U_inv_transpose)
-
-
-def polar_decomposition(A: Vector, tol=1e-12):
-    """Returns the unitary matrix U in the polar decomposition of a matrix A.
-    A = UP, where U is unitary and P is positive semi-definite Hermitian.
-    A - matrix to be decomposed.
-    tol - tolerance for convergence.
-    """
-    U = A.copy()
-    while True:
-        U_new = unitary_step(U)
-        if vec.norm(U_new - U) < tol:
-            return U_new
-        U = U_new
-
-
 def update(num):
     global R, v, quiver
-    Psi = Vector([[0, -omega[2]*theta, omega[1]*theta],
-                    [omega[2]*theta, 0, -omega[0]*theta],
-                    [-omega[1]*theta, omega[0]*theta, 0]])
-    R_dot = Psi @ R
-    R += R_dot
-    R = polar_decomposition(R)
+    # Exact rotation increment: R stays orthogonal without re-projection
+    R = vec.so3_exp(omega, theta) @ R
     det = vec.det(R)
     # print(f"Determinant of R: {det}", end='\n\n')
     v_new = vec.dot(R, v)
@@ -1,5 +1,6 @@
 from Vector import Vector
 import Vector as vec
+import math
 import pytest
 
 
@@ -554,4 +555,675 @@ def test_transpose():
     F_transpose = F.T
     expected_F_transpose = Vector([5, 1, 2])
     assert F_transpose == expected_F_transpose
-    
\ No newline at end of file
+    
+
+def test_storage():
+    """Tests the flat buffer storage and views of a vector."""
+    A = Vector([[1, 2, 3], [4, 5, 6]])
+    assert A.components == [[1, 2, 3], [4, 5, 6]]
+    assert len(A._data) == 6
+
+    row = A[1]
+    row[0] = 7
+    assert A[1, 0] == 7
+    assert row._data is A._data
+
+    column = A[:, 2]
+    assert column == Vector([3, 6])
+    column[1] = 9
+    assert A == Vector([[1, 2, 3], [7, 5, 9]])
+
+    B = Vector([1, 2, 3, 4, 5])
+    assert B[::-1] == Vector([5, 4, 3, 2, 1])
+    assert B[::-2].components == [5, 3, 1]
+
+    C = A.copy()
+    C[0, 0] = 10
+    assert A[0, 0] == 1
+
+    # 1D slices are copies, also when taken from a row view
+    part = B[1:3]
+    part[0] = 0
+    assert B == Vector([1, 2, 3, 4, 5])
+    A[0][1:] = A[0][:2]
+    assert A[0] == Vector([1, 1, 2])
+
+    # Rows alias the matrix, so the tuple swap duplicates a row; swap_rows does not
+    D = Vector([[1, 2], [3, 4]])
+    D[0], D[1] = D[1], D[0]
+    assert D == Vector([[3, 4], [3, 4]])
+    D = Vector([[1, 2], [3, 4]])
+    D[0], D[1] = D[1].copy(), D[0].copy()
+    assert D == Vector([[3, 4], [1, 2]])
+    D.swap_rows(0, 1)
+    assert D == Vector([[1, 2], [3, 4]])
+    D.T.swap_rows(0, -1)
+    assert D == Vector([[2, 1], [4, 3]])
+    with pytest.raises(ValueError):
+        B.swap_rows(0, 1)
+
+
+def test_transpose_view():
+    """Tests that transposes are views over the original buffer."""
+    A = Vector([[1, 2, 3], [4, 5, 6]])
+    B = A.T
+    assert B._data is A._data
+    assert B.shape == (3, 2)
+    assert B[2, 1] == 6
+    assert B[0] == Vector([1, 4])
+    assert not B.is_contiguous
+    assert B.T.is_contiguous
+
+    B[0, 1] = 8
+    assert A[1, 0] == 8
+
+    C = B.contiguous()
+    assert C.is_contiguous
+    assert C == Vector([[1, 8], [2, 5], [3, 6]])
+    C[0, 0] = 0
+    assert A[0, 0] == 1
+
+    assert vec.transpose(A) == B
+    assert A.T @ A == Vector([[65, 42, 51], [42, 29, 36], [51, 36, 45]])
+
+
+def test_trusted_construction():
+    """Tests results built without re-validation and the slotted layout."""
+    A = Vector([[1, 2], [3, 4]])
+    assert not hasattr(A, '__dict__')
+    with pytest.raises(AttributeError):
+        A.extra = 1
+
+    B = A + A
+    assert B.shape == (2, 2)
+    assert B == Vector([[2, 4], [6, 8]])
+    assert vec.zeros((2, 3)).shape == (2, 3)
+    assert vec.eye(3) == Vector([[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+    assert vec.absolute(Vector([-1, 2, -3])) == Vector([1, 2, 3])
+
+    with pytest.raises(ValueError):
+        Vector([1, [2, 3]])
+    with pytest.raises(TypeError):
+        Vector([1, "a"])
+
+
+def test_iteration():
+    """Tests iterating over vectors, rows and columns."""
+    A = Vector([1, 2, 3])
+    assert list(A) == [1, 2, 3]
+    x, y, z = A
+    assert (x, y, z) == (1, 2, 3)
+
+    B = Vector([[1, 2, 3], [4, 5, 6]])
+    rows = list(B)
+    assert rows == [Vector([1, 2, 3]), Vector([4, 5, 6])]
+    assert list(B.rows()) == rows
+    assert list(B.cols()) == [Vector([1, 4]), Vector([2, 5]), Vector([3, 6])]
+    assert list(B.T.rows()) == list(B.cols())
+
+    for row in B:
+        row[0] = 0
+    assert B == Vector([[0, 2, 3], [0, 5, 6]])
+
+    with pytest.raises(ValueError):
+        A.rows()
+    with pytest.raises(ValueError):
+        A.cols()
+
+
+def test_backends():
+    """Tests that the numpy backend matches the pure-Python backend."""
+    np = pytest.importorskip("numpy")
+    A = Vector([[4, 9, 3], [1, 5, 8], [3, 3, 9]])
+    b = Vector([1, 2, 3])
+    previous = vec.get_backend()
+    try:
+        Vector.set_backend('python')
+        expected = [A + A, A - A.T, 2 * A, A / 4, A @ A, A @ b, b @ A, vec.dot(b, b),
+                    vec.cross(b, A[0]), vec.norm(A), vec.det(A), vec.inv(A)]
+        Vector.set_backend('numpy')
+        assert Vector.get_backend() == 'numpy'
+        result = [A + A, A - A.T, 2 * A, A / 4, A @ A, A @ b, b @ A, vec.dot(b, b),
+                  vec.cross(b, A[0]), vec.norm(A), vec.det(A), vec.inv(A)]
+        assert isinstance((A + A)._data, np.ndarray)
+        for x, y in zip(result, expected):
+            if isinstance(x, Vector):
+                assert x == y
+            else:
+                assert_equal(x, y)
+
+        L, U, P, _ = vec.lu_decomposition(A)
+        assert P @ A == L @ U
+        with pytest.raises(ValueError):
+            vec.inv(Vector([[1, 2], [2, 4]]))
+
+        # Both backends raise on division by zero instead of returning inf
+        zero = Vector([1, 0, 2])
+        for backend in ('python', 'numpy'):
+            Vector.set_backend(backend)
+            for divide in (lambda: b / 0, lambda: b / zero, lambda: 1 / zero, lambda: b.copy().__itruediv__(zero)):
+                with pytest.raises(ZeroDivisionError):
+                    divide()
+            with vec.lazy():
+                expression = b / zero
+            with pytest.raises(ZeroDivisionError):
+                expression.evaluate()
+            assert b / (zero + 1) == Vector([0.5, 2, 1])
+    finally:
+        vec.set_backend(previous)
+
+    with pytest.raises(ValueError):
+        vec.set_backend('fortran')
+
+
+def test_in_place():
+    """Tests in-place operators and out= destinations."""
+    A = Vector([[1, 2], [3, 4]])
+    buffer = A._data
+    B = A
+    A += Vector([[1, 1], [1, 1]])
+    A -= [[0, 1], [0, 1]]
+    A *= 2
+    A /= 4
+    assert A is B
+    assert A._data is buffer
+    assert A == Vector([[1, 1], [2, 2]])
+
+    C = Vector([[1, 2], [3, 4]])
+    C += C.T
+    assert C == Vector([[2, 5], [5, 8]])
+    row = C[1]
+    row *= 0
+    assert C == Vector([[2, 5], [0, 0]])
+    with pytest.raises(ValueError):
+        C += Vector([1, 2, 3])
+
+    D = Vector([[1, 2], [3, 4]])
+    E = vec.zeros((2, 2))
+    assert vec.matmul(D, D, out=E) is E
+    assert E == Vector([[7, 10], [15, 22]])
+    assert vec.dot(D, Vector([1, 1]), out=E[0]) == Vector([3, 7])
+    assert E == Vector([[3, 7], [15, 22]])
+    vec.transpose(D, out=E)
+    assert E == Vector([[1, 3], [2, 4]])
+    vec.absolute(-D, out=E)
+    assert E == D
+    vec.inv(D, out=E)
+    assert E == Vector([[-2, 1], [1.5, -0.5]])
+    vec.matmul(D, D, out=D)
+    assert D == Vector([[7, 10], [15, 22]])
+    with pytest.raises(ValueError):
+        vec.matmul(D, D, out=vec.zeros((3, 3)))
+
+
+def test_broadcasting():
+    """Tests broadcasting arithmetic and the apply engine."""
+    A = Vector([[1, 2, 3], [4, 5, 6]])
+    assert A + 1 == Vector([[2, 3, 4], [5, 6, 7]])
+    assert 1 - A == Vector([[0, -1, -2], [-3, -4, -5]])
+    assert A + Vector([10, 20, 30]) == Vector([[11, 22, 33], [14, 25, 36]])
+    assert A - Vector([[1], [2]]) == Vector([[0, 1, 2], [2, 3, 4]])
+    assert Vector([[1], [2]]) * Vector([1, 2, 3]) == Vector([[1, 2, 3], [2, 4, 6]])
+    assert A * A == Vector([[1, 4, 9], [16, 25, 36]])
+    assert A / Vector([1, 2, 3]) == Vector([[1, 1, 1], [4, 2.5, 2]])
+    assert 6 / Vector([1, 2, 3]) == Vector([6, 3, 2])
+    with pytest.raises(ValueError):
+        A + Vector([1, 2])
+    with pytest.raises(TypeError):
+        A + "a"
+
+    A += Vector([[1], [0]])
+    assert A == Vector([[2, 3, 4], [4, 5, 6]])
+    E = Vector([1, 2, 3])
+    with pytest.raises(ValueError):
+        E += A
+
+    B = vec.apply(math.hypot, Vector([3, 5]), 4)
+    assert B == Vector([5, 6.4031242374328485])
+    C = vec.apply(lambda x, y, z: x * y + z, Vector([[1], [2]]), Vector([1, 2, 3]), 1)
+    assert C == Vector([[2, 3, 4], [3, 5, 7]])
+    D = vec.zeros(3)
+    assert vec.apply(math.sin, Vector([0, 0, 0]), out=D) is D
+    with pytest.raises(ValueError):
+        vec.apply(math.sin, 1)
+
+
+def test_lazy():
+    """Tests lazy expression graphs and their fused evaluation."""
+    U = Vector([[1, 2], [3, 4]])
+    V = Vector([[4, 3], [2, 1]])
+    with vec.lazy():
+        W = 0.5 * (U + V.T)
+        D = -(W - U) / 2
+    assert isinstance(W, vec.Expression)
+    assert W.shape == (2, 2)
+    assert W == Vector([[2.5, 2], [3, 2.5]])
+    assert W[1, 0] == 3
+    assert W.evaluate() is W.evaluate()
+    assert_equal(vec.norm(D), vec.norm(-(W.evaluate() - U) / 2))
+    assert vec.det(W) == vec.det(W.evaluate())
+
+    with Vector.lazy():
+        E = U + Vector([10, 20])
+        F = E * Vector([[1], [2]])
+    assert F == Vector([[11, 22], [26, 48]])
+    assert isinstance(E + 1, vec.Expression)
+    assert isinstance(U + 1, Vector)
+
+    with vec.lazy():
+        U += V * 2 - 1
+    assert U == Vector([[8, 7], [6, 5]])
+
+
+def test_matmul_kernel():
+    """Tests the packed, blocked matmul kernel against a direct computation."""
+    import random
+    random.seed(0)
+    m, k, n = 5, 37, 41
+    A = Vector([[random.uniform(-1, 1) for _ in range(k)] for _ in range(m)])
+    B = Vector([[random.uniform(-1, 1) for _ in range(n)] for _ in range(k)])
+    expected = Vector([[sum(A[i, p] * B[p, j] for p in range(k)) for j in range(n)] for i in range(m)])
+    assert A @ B == expected
+    assert (B.T @ A.T) == expected.T
+    assert vec.dot(A, B[:, 3]) == expected[:, 3]
+    assert A[2] @ B == expected[2]
+    assert B.T @ A[2] == expected[2]
+
+
+def test_parallel_matmul():
+    """Tests that the process pool matmul matches the serial kernel exactly."""
+    import random
+    random.seed(1)
+    A = Vector([[random.uniform(-1, 1) for _ in range(23)] for _ in range(19)])
+    B = Vector([[random.uniform(-1, 1) for _ in range(17)] for _ in range(23)])
+    serial = vec.matmul(A, B, workers=1)
+    parallel = vec.matmul(A, B, workers=3)
+    assert parallel._values() == serial._values()
+    assert vec.dot(A.T.T, B, workers=2)._values() == serial._values()
+
+    out = vec.zeros((19, 17))
+    assert vec.matmul(A, B, out=out, workers=2) is out
+    assert out._values() == serial._values()
+
+
+def test_lu_packed():
+    """Tests the packed LU factorization and its compatibility wrapper."""
+    A = Vector([[0, 2, 1, 0],
+                [8, 6, 9, 9],
+                [9, 0, 8, 7],
+                [2, 4, 7, 2]])
+    LU, pivots = vec.lu_packed(A)
+    assert pivots == [2, 1, 3, 3]
+    assert LU.shape == (4, 4)
+    assert all(abs(LU[i, j]) <= 1 for i in range(4) for j in range(i))
+
+    L, U, P, swap_count = vec.lu_decomposition(A)
+    assert swap_count == 2
+    assert P @ A == L @ U
+    assert all(L[i, j] == 0 for i in range(4) for j in range(i + 1, 4))
+    assert all(U[i, j] == 0 for i in range(4) for j in range(i))
+    assert all(L[i, i] == 1 for i in range(4))
+
+    B = A.copy()
+    packed, _ = vec.lu_packed(B, overwrite=True)
+    assert packed is B
+    assert B == LU
+
+    S = Vector([[1, 2], [2, 4]])
+    assert vec.det(S) == 0
+    L, U, P, _ = vec.lu_decomposition(S)
+    assert P @ S == L @ U
+
+
+def test_lu_factor():
+    """Tests reusing one LU factorization for many solves."""
+    A = Vector([[0, 2, 1, 0],
+                [8, 6, 9, 9],
+                [9, 0, 8, 7],
+                [2, 4, 7, 2]])
+    F = vec.lu_factor(A)
+    assert isinstance(F, vec.LUFactor)
+    assert F.det() == pytest.approx(vec.det(A))
+    assert F.inv() == vec.inv(A)
+
+    b = Vector([1, 2, 3, 4])
+    x = F.solve(b)
+    assert x.shape == (4,)
+    assert A @ x == b
+    assert vec.solve(A, [1, 2, 3, 4]) == x
+
+    B = Vector([[1, 0], [0, 1], [2, 3], [4, 5]])
+    X = F.solve_many(B)
+    assert A @ X == B
+    assert F.solve(B) == X
+    assert F.solve_many(vec.eye(4)) == vec.inv(A)
+    assert X[:, 1] == F.solve(B[:, 1])
+
+    out = vec.zeros((4, 4))
+    assert F.inv(out=out) is out
+    assert out == vec.inv(A)
+
+    S = vec.lu_factor([[1, 2], [2, 4]])
+    assert S.det() == 0
+    with pytest.raises(ValueError):
+        S.solve([1, 1])
+    with pytest.raises(ValueError):
+        F.solve([1, 2, 3])
+
+
+def test_version_cache():
+    """Tests mutation versions and the derived-result cache."""
+    vec.clear_cache()
+    # Matrices up to 4 x 4 use closed forms and bypass the cache
+    A = vec.eye(5)
+    A[:2, :2] = [[4, 3], [6, 3]]
+    assert A.version == 1
+    A[0, 0] = 4
+    assert A.version == 2
+    A += 0
+    assert A.version > 2
+    version, row = A.version, A[1]
+    row[0] = 6
+    assert A.version > version and row.version == A.version
+
+    assert vec.det(A) == pytest.approx(-6)
+    assert vec.det(A) == pytest.approx(-6)
+    assert vec.cache_info().hits == 1
+    assert vec.lu_factor(A) is vec.lu_factor(A)
+    Ai = vec.inv(A)
+    Ai[0, 0] = 100
+    assert vec.inv(A)[:2, :2] == Vector([[-0.5, 0.5], [1, -2 / 3]])
+
+    A[1, :2] = [2, 1]
+    assert vec.det(A) == pytest.approx(-2)
+    A[1] *= 2
+    assert vec.det(A) == pytest.approx(-4)
+    vec.dot(vec.eye(5), vec.ones((5, 5)), out=A)
+    assert vec.det(A) == 0
+
+    # Short vectors bypass the cache, longer ones are cached until changed
+    hits = vec.cache_info().hits
+    v = Vector([3, 4])
+    assert vec.norm(v) == vec.norm(v) == 5
+    v = Vector([3, 4] + [0] * 98)
+    assert vec.norm(v) == vec.norm(v) == 5
+    assert vec.cache_info().hits == hits + 1
+    v[:2] = [6, 8]
+    assert vec.norm(v) == 10
+
+    vec.set_cache_size(2)
+    try:
+        vectors = [Vector([i] + [1] * 99) for i in range(3)]
+        for u in vectors:
+            vec.norm(u)
+        assert vec.cache_info().currsize == 2
+        hits, misses = vec.cache_info()[:2]
+        vec.norm(vectors[2])
+        vec.norm(vectors[0])
+        assert vec.cache_info()[:2] == (hits + 1, misses + 1)
+        del vectors, u
+        assert vec.cache_info().currsize == 0
+    finally:
+        vec.set_cache_size(128)
+    vec.clear_cache()
+    assert vec.cache_info() == (0, 0, 128, 0)
+
+
+def test_small_kernels():
+    """Tests the closed-form kernels for 2 x 2, 3 x 3 and 4 x 4 matrices."""
+    for n in (2, 3, 4):
+        A = Vector([[(i * 7 + j * 3) % 5 + (i == j) * 4 for j in range(n)] for i in range(n)])
+        B = Vector([[i - j * 2 for j in range(n)] for i in range(n)])
+        x = Vector([j + 1 for j in range(n)])
+        F = vec.lu_factor(A)
+        assert vec.det(A) == pytest.approx(F.det())
+        assert vec.inv(A) == F.inv()
+        assert A @ vec.inv(A) == vec.eye(n)
+        assert A @ B == Vector([[sum(A[i, k] * B[k, j] for k in range(n)) for j in range(n)]
+                                for i in range(n)])
+        assert A @ x == Vector([sum(A[i, k] * x[k] for k in range(n)) for i in range(n)])
+        assert A.T @ B == vec.dot(A.T.copy(), B)
+
+        out = vec.zeros((n, n))
+        assert vec.inv(A, out=out) is out and out == F.inv()
+        with pytest.raises(ValueError):
+            vec.inv(vec.ones((n, n)))
+        assert vec.det(vec.ones((n, n))) == 0
+
+
+def test_batch_arrays():
+    """Tests batched operations on Vec3Array and Mat3Array."""
+    points = Vector([[1, 0, 0], [0, 3, 4], [1, 2, 2]])
+    P = vec.Vec3Array.from_vector(points)
+    assert len(P) == 3
+    assert P.to_vector() == points
+    assert P[1] == Vector([0, 3, 4])
+    assert P.x == Vector([1, 0, 1])
+    assert vec.Vec3Array.from_vector(Vector([1, 2, 3])).to_vector() == Vector([[1, 2, 3]])
+
+    Q = vec.Vec3Array([0, 1, 2], [1, 0, 0], [0, 0, 1])
+    assert P.dot(Q) == Vector([vec.dot(P[i], Q[i]) for i in range(3)])
+    C = P.cross(Q)
+    assert all(C[i] == vec.cross(P[i], Q[i]) for i in range(3))
+    assert P.norm() == Vector([1, 5, 3])
+    assert P.normalize().norm() == Vector([1, 1, 1])
+    assert P.normalize()[1] == Vector([0, 0.6, 0.8])
+
+    R = Vector([[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+    S = Vector([[2, 0, 0], [0, 1, 1], [0, 0, 3]])
+    single = vec.Mat3Array.from_vectors(R)
+    rotated = single @ P
+    assert all(rotated[i] == vec.dot(R, points[i]) for i in range(3))
+
+    M = vec.Mat3Array.from_vectors([R, S, R @ S])
+    assert len(M) == 3 and M[1] == S
+    moved = M.transform(P)
+    assert all(moved[i] == M[i] @ P[i] for i in range(3))
+    composed = single @ M
+    assert [composed[i] for i in range(3)] == [R @ R, R @ S, R @ R @ S]
+    assert composed.to_vectors() == [R @ R, R @ S, R @ R @ S]
+
+    with pytest.raises(ValueError):
+        vec.Vec3Array([1, 2], [1, 2], [1])
+    with pytest.raises(ValueError):
+        vec.Vec3Array.from_vector(Vector([[1, 2], [3, 4]]))
+    with pytest.raises(ValueError):
+        vec.Mat3Array.from_vectors([vec.eye(2)])
+
+
+def test_polar():
+    """Tests the scaled Newton polar decomposition."""
+    A = Vector([[100, 1, 0],
+                [0, 0.01, 0],
+                [0, 0, 1]])
+    U, H, iterations = vec.polar(A)
+    assert U.T @ U == vec.eye(3)
+    assert U @ H == A
+    assert H == H.T
+    assert vec.det(U) == pytest.approx(1)
+    assert iterations < 10
+
+    R = Vector([[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+    U, H, iterations = vec.polar(R)
+    assert U == R and H == vec.eye(3)
+
+    B = Vector([[4, 1, 0, 0, 2],
+                [1, 5, 1, 0, 0],
+                [0, 1, 6, 1, 0],
+                [0, 0, 1, 7, 1],
+                [3, 0, 0, 1, 8]])
+    U, H, _ = vec.polar(B)
+    assert U.T @ U == vec.eye(5)
+    assert U @ H == B
+
+    _, _, iterations = vec.polar(A, maxiter=2)
+    assert iterations == 2
+    with pytest.raises(ValueError):
+        vec.polar(Vector([[1, 2, 3], [4, 5, 6]]))
+    with pytest.raises(ValueError):
+        vec.polar(vec.ones((3, 3)))
+
+
+def test_sparse():
+    """Tests the CSR sparse matrix and its products."""
+    A = vec.SparseMatrix([0, 1, 1, 2, 2, 0], [0, 0, 2, 1, 1, 0], [2, 1, 3, 4, 1, 0], (3, 3))
+    dense = Vector([[2, 0, 0], [1, 0, 3], [0, 5, 0]])
+    assert A.nnz == 4
+    assert list(A.indptr) == [0, 1, 3, 4]
+    assert list(A.indices) == [0, 0, 2, 1]
+    assert A.to_vector() == dense
+    assert vec.SparseMatrix.from_vector(dense).to_vector() == dense
+    assert A.T.to_vector() == dense.T
+    assert vec.transpose(A).to_vector() == dense.T
+
+    x = Vector([1, 2, 3])
+    B = Vector([[1, 2], [3, 4], [5, 6]])
+    assert A @ x == dense @ x
+    assert vec.dot(A, x) == dense @ x
+    assert A @ B == dense @ B
+    assert x @ A == x @ dense
+    assert B.T @ A == B.T @ dense
+    assert (A @ A).to_vector() == dense @ dense
+    assert vec.matmul(A, A.T).to_vector() == dense @ dense.T
+
+    out = vec.zeros((3,))
+    assert vec.dot(A, x, out=out) is out and out == dense @ x
+
+    wide = vec.SparseMatrix([0, 1], [4, 0], [1, 2], (2, 5))
+    assert wide.T.shape == (5, 2) and wide.T.to_vector() == wide.to_vector().T
+    assert (wide @ wide.T).to_vector() == Vector([[1, 0], [0, 4]])
+
+    with pytest.raises(ValueError):
+        vec.SparseMatrix([3], [0], [1], (3, 3))
+    with pytest.raises(ValueError):
+        A @ Vector([1, 2])
+    with pytest.raises(ValueError):
+        A @ wide
+
+
+def test_iterative_solvers():
+    """Tests CG, BiCGSTAB and GMRES with and without preconditioners."""
+    n = 30
+    rows, cols, values = [], [], []
+    for i in range(n):
+        for j, value in ((i - 1, -1.0), (i, 4.0), (i + 1, -1.5)):
+            if 0 <= j < n:
+                rows.append(i)
+                cols.append(j)
+                values.append(value)
+    A = vec.SparseMatrix(rows, cols, values, (n, n))
+    S = A @ A.T
+    dense = A.to_vector()
+    b = Vector([math.sin(i) for i in range(n)])
+    expected = vec.solve(dense, b)
+
+    result = vec.cg(S, S @ expected)
+    assert result.converged
+    assert result.x == expected
+    assert result.iterations == len(result.residuals) - 1
+    assert result.residuals[-1] <= 1e-8
+    assert vec.cg(S.to_vector(), S @ expected, M='jacobi').x == expected
+
+    for solver in (vec.bicgstab, vec.gmres):
+        for M in (None, 'jacobi', vec.ilu0(A)):
+            result = solver(A, b, M=M)
+            assert result.converged
+            assert result.x == expected
+    assert vec.gmres(dense, b, restart=5).x == expected
+    assert vec.gmres(A, b, M='ilu0').iterations == 1
+
+    operator = vec.LinearOperator((n, n), lambda x: A @ x)
+    assert vec.bicgstab(operator, b).x == expected
+    assert vec.gmres(lambda x: A @ x, b).x == expected
+    assert operator @ expected == b
+
+    x0 = expected.copy()
+    result = vec.cg(S, S @ expected, x0=x0)
+    assert result.iterations == 0 and result.x is not x0
+    result = vec.cg(S, S @ expected, maxiter=2)
+    assert not result.converged and result.iterations == 2
+    assert result.residuals[-1] < result.residuals[0]
+
+    # BiCGSTAB breaks down on the rotation (shadow . v = 0) where GMRES does not
+    rotation, e1 = Vector([[0, 1], [-1, 0]]), Vector([1, 0])
+    result = vec.bicgstab(rotation, e1)
+    assert not result.converged and result.iterations == 0
+    assert vec.gmres(rotation, e1).x == Vector([0, 1])
+
+    with pytest.raises(ValueError):
+        vec.cg(S, b, M='spai')
+    for M in ('jacobi', 'ilu0'):
+        with pytest.raises(ValueError, match="explicit"):
+            vec.cg(operator, b, M=M)
+        with pytest.raises(ValueError, match="explicit"):
+            vec.gmres(lambda x: A @ x, b, M=M)
+    with pytest.raises(ValueError):
+        vec.jacobi(Vector([[0, 1], [1, 0]]))
+
+
+def test_so3():
+    """Tests rotation_matrix and the SO(3) exponential and logarithm maps."""
+    R = vec.rotation_matrix([0, 0, 2], math.pi / 2)
+    assert R == Vector([[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+    assert R @ Vector([1, 0, 0]) == Vector([0, 1, 0])
+    assert vec.so3_exp([0, 0, math.pi / 2]) == R
+    assert vec.so3_exp([0, 0, 1], math.pi / 2) == R
+    assert vec.so3_exp([0, 0, 0]) == vec.eye(3)
+
+    omega = Vector([0.3, -0.2, 0.5])
+    v = Vector([1, 2, 3])
+    step = vec.so3_exp(omega, 1e-6)
+    assert step @ v == v + 1e-6 * vec.cross(omega, v)
+
+    for w in ([0.3, -0.2, 0.5], [1e-9, 0, 2e-9], [0, 2.5, -1], [math.pi, 0, 0], [0, 0, 0]):
+        w = Vector(w)
+        assert vec.so3_log(vec.so3_exp(w)) == w
+    R = vec.eye(3)
+    for _ in range(1000):
+        R = vec.so3_exp(omega, 0.01) @ R
+    assert all(abs(a) < 1e-12 for row in R.T @ R - vec.eye(3) for a in row)
+    assert vec.so3_log(R) == omega * 10 - 2 * math.pi * omega / vec.norm(omega)
+
+    with pytest.raises(ValueError):
+        vec.rotation_matrix([0, 0, 0], 1)
+    with pytest.raises(ValueError):
+        vec.so3_log(vec.eye(2))
+
+
+def test_quaternion():
+    """Tests quaternion composition, conversion, slerp and rotation."""
+    Q = vec.Quaternion
+    axis, theta = Vector([1, 2, 2]), 0.7
+    q = Q.from_axis_angle(axis, theta)
+    assert q.norm() == pytest.approx(1)
+    assert q.to_matrix() == vec.rotation_matrix(axis, theta)
+    assert Q.from_matrix(q.to_matrix()) == q
+    for R in (vec.rotation_matrix([1, 0, 0], 3), vec.rotation_matrix([0, 1, 0], -3),
+              vec.rotation_matrix([0, 0, 1], math.pi), vec.eye(3)):
+        assert Q.from_matrix(R).to_matrix() == R
+
+    p = Q.from_axis_angle([0, 0, 1], 1.2)
+    assert (q * p).to_matrix() == q.to_matrix() @ p.to_matrix()
+    assert q * q.conjugate() == Q(1, 0, 0, 0)
+    assert (2 * q).normalize() == q
+    assert (-q).to_matrix() == q.to_matrix()
+
+    v = Vector([0.5, -1, 2])
+    assert q.rotate(v) == q.to_matrix() @ v
+    points = Vector([[1, 0, 0], [0.5, -1, 2], [3, 3, 3]])
+    rotated = q.rotate(points)
+    assert all(rotated[i] == q.rotate(points[i]) for i in range(3))
+    batch = q.rotate(vec.Vec3Array.from_vector(points))
+    assert batch.to_vector() == rotated
+
+    start, end = Q.from_axis_angle([0, 0, 1], 0.2), Q.from_axis_angle([0, 0, 1], 1.4)
+    assert vec.slerp(start, end, 0) == start
+    assert vec.slerp(start, end, 1) == end
+    assert vec.slerp(start, end, 0.25) == Q.from_axis_angle([0, 0, 1], 0.5)
+    assert vec.slerp(start, -end, 0.5) == Q.from_axis_angle([0, 0, 1], 0.8)
+    assert vec.slerp(start, start, 0.5) == start
+
+    with pytest.raises(ValueError):
+        Q(0, 0, 0, 0).normalize()
+    with pytest.raises(ValueError):
+        q.rotate(Vector([1, 2]))